@@ -3,8 +3,21 @@ import streamlit as st
 import pandas as pd
 import requests
 from datetime import datetime, timedelta
-import pytz
-import plotly.graph_objects as go
+
+from frequency.align import Aligner
+from frequency.cache import CADENCE_S, SharedCache
+from frequency.decimate import CHART_POINTS
+from frequency.events import EventDetector
+from frequency.metrics import CACHE_REQUESTS, STAGE_SECONDS, UPSTREAM_BYTES, UPSTREAM_SECONDS, registry, serve as serve_metrics, span
+from frequency.pyramid import Pyramid, detail_frame
+from frequency.render import band_power_figure, build_figure, local_to_utc, spectrum_figure, stream_figure, to_local
+from frequency.service import INTERVAL_MINUTES, build_ingest
+from frequency.spectral import BANDS, SEGMENT_S, STEP_S, SpectralIndex
+from frequency.stats import BAND_HIGH, BAND_LOW, describe
+from frequency.store import FrequencyStore
+from frequency.stream import ChartStream, frame_reader, live_chart
+from frequency.theme import DARK, LIGHT, MODEBAR_CSS, chart_colors, theme_css
+from frequency.transform import minute_range_ns
 
 # Set Streamlit theme and page config for a modern look
 st.set_page_config(
@@ -19,177 +32,11 @@ st.set_page_config(
 # Theme selection (light/dark)
 with st.sidebar:
     st.markdown("---")
-    theme = st.radio("Teema / Theme", ["Tumma / Dark", "Vaalea / Light"], index=0, key="theme_select")
+    theme = st.radio("Teema / Theme", [DARK, LIGHT], index=0, key="theme_select")
     st.session_state["theme"] = theme
 
-# Theme colors
-if st.session_state.get("theme", "Tumma / Dark") == "Vaalea / Light":
-    bg = "#F5F6FA"
-    fg = "#18191A"
-    sidebar_bg = "#E9ECF1"
-    plot_bg = "#F5F6FA"
-    plot_paper = "#F5F6FA"
-    color_nordic = "#1976D2"
-    color_finland = "#FFA000"
-    color_low = "#FF5252"
-    color_high = "#1976D2"
-    caption = "#444"
-else:
-    bg = "#18191A"
-    fg = "#FAFAFA"
-    sidebar_bg = "#23272F"
-    plot_bg = "#23272F"
-    plot_paper = "#23272F"
-    color_nordic = "#4FC3F7"
-    color_finland = "#FFD54F"
-    color_low = "#FF5252"
-    color_high = "#42A5F5"
-    caption = "#E0E0E0"
-
-# Animated/smooth loading and hover effects in CSS
-st.markdown(
-    f"""
-    <style>
-    html, body, .block-container, .stApp {{
-        background-color: {bg} !important;
-        color: {fg} !important;
-        transition: background 0.5s, color 0.5s;
-    }}
-    header[data-testid="stHeader"], .st-emotion-cache-18ni7ap, .st-emotion-cache-1avcm0n {{
-        background: {bg} !important;
-        color: {fg} !important;
-        border-bottom: 1px solid #23272F !important;
-        transition: background 0.5s, color 0.5s;
-    }}
-    .sidebar-content, .css-1d391kg, .css-1lcbmhc, .stSidebar {{
-        background-color: {sidebar_bg} !important;
-        color: {fg} !important;
-        transition: background 0.5s, color 0.5s;
-    }}
-    .stSlider label, .stSlider .css-1y4p8pa, .stSlider .css-1y4p8pa span, .stSlider .css-1y4p8pa div, .stSlider .css-1y4p8pa input, .stSlider .css-1y4p8pa .css-1n76uvr, .stSlider .css-1n76uvr, .stSlider .css-1n76uvr span, .stSlider .css-1n76uvr div, .stSlider .css-1n76uvr input {{
-        color: {fg} !important;
-    }}
-    .stSlider > div[data-baseweb="slider"] {{
-        margin-bottom: 1.5rem;
-    }}
-    .stSlider .rc-slider-mark-text, .stSlider .rc-slider-value, .stSlider .rc-slider-tooltip-inner {{
-        color: {fg} !important;
-        background: {sidebar_bg} !important;
-        font-weight: 700;
-    }}
-    .stCheckbox {{
-        margin-bottom: 0.5rem;
-    }}
-    .stExpanderHeader {{
-        font-size: 1.2rem;
-        font-weight: 800;
-        color: {fg} !important;
-        letter-spacing: 0.01em;
-        transition: color 0.5s;
-    }}
-    .stPlotlyChart {{
-        background: {plot_bg} !important;
-        border-radius: 12px;
-        box-shadow: 0 2px 8px rgba(0,0,0,0.18);
-        padding: 1rem;
-        transition: background 0.5s;
-        opacity: 0;
-        animation: fadein 0.7s forwards;
-    }}
-    @keyframes fadein {{
-        from {{ opacity: 0; }}
-        to {{ opacity: 1; }}
-    }}
-    .stButton > button {{
-        border-radius: 8px;
-        font-weight: 800;
-        background: {sidebar_bg};
-        color: {fg};
-        border: 1px solid #888;
-        transition: background 0.3s, color 0.3s;
-    }}
-    .stButton > button:hover {{
-        background: #333;
-        color: #fff;
-        box-shadow: 0 0 8px #888;
-    }}
-    .stCaption {{
-        color: {caption};
-        font-size: 1.08em;
-        font-weight: 600;
-        transition: color 0.5s;
-    }}
-    .stMarkdown, .stText, .stSubheader, .stHeader, .stTitle, .stDataFrame, .stTable, .stExpanderContent, .stAlert, .stException, .stWarning, .stInfo, .stSuccess, .stError {{
-        color: {fg} !important;
-        font-weight: 600;
-        background: transparent !important;
-        transition: color 0.5s;
-    }}
-    .stDataFrame, .stTable {{
-        background: {sidebar_bg} !important;
-        border-radius: 8px;
-    }}
-    .stExpanderContent {{
-        background: {sidebar_bg} !important;
-    }}
-    .st-bb, .st-cq, .st-cv, .st-cw, .st-cx, .st-cy, .st-cz, .st-da, .st-db, .st-dc, .st-dd, .st-de, .st-df, .st-dg, .st-dh, .st-di, .st-dj, .st-dk, .st-dl, .st-dm, .st-dn, .st-do, .st-dp, .st-dq, .st-dr, .st-ds, .st-dt, .st-du, .st-dv, .st-dw, .st-dx, .st-dy, .st-dz, .st-e0, .st-e1, .st-e2, .st-e3, .st-e4, .st-e5, .st-e6, .st-e7, .st-e8, .st-e9, .st-ea, .st-eb, .st-ec, .st-ed, .st-ee, .st-ef, .st-eg, .st-eh, .st-ei, .st-ej, .st-ek, .st-el, .st-em, .st-en, .st-eo, .st-ep, .st-eq, .st-er, .st-es, .st-et, .st-eu, .st-ev, .st-ew, .st-ex, .st-ey, .st-ez {{
-        background-color: {sidebar_bg} !important;
-        color: {fg} !important;
-    }}
-    /* RESPONSIVE DESIGN */
-    @media (max-width: 900px) {{
-        html, body, .block-container, .stApp {{
-            font-size: 15px !important;
-        }}
-        .stPlotlyChart {{
-            padding: 0.5rem !important;
-        }}
-        .stExpanderHeader {{
-            font-size: 1.05rem !important;
-        }}
-        .stButton > button {{
-            font-size: 1rem !important;
-        }}
-        .stSidebar, .sidebar-content, .css-1d391kg, .css-1lcbmhc {{
-            font-size: 15px !important;
-        }}
-    }}
-    @media (max-width: 600px) {{
-        html, body, .block-container, .stApp {{
-            font-size: 13px !important;
-        }}
-        .stPlotlyChart {{
-            padding: 0.2rem !important;
-        }}
-        .stExpanderHeader {{
-            font-size: 0.95rem !important;
-        }}
-        .stButton > button {{
-            font-size: 0.95rem !important;
-        }}
-        .stSidebar, .sidebar-content, .css-1d391kg, .css-1lcbmhc {{
-            font-size: 13px !important;
-        }}
-        .stPlotlyChart {{
-            min-height: 350px !important;
-            height: 350px !important;
-        }}
-    }}
-    /* Hover effect for expander headers and chart */
-    .stExpanderHeader:hover {{
-        color: #FFEB3B !important;
-        cursor: pointer;
-        text-shadow: 0 0 8px #FFEB3B44;
-        transition: color 0.2s, text-shadow 0.2s;
-    }}
-    .stPlotlyChart:hover {{
-        box-shadow: 0 0 24px #1976D2AA;
-        transition: box-shadow 0.3s;
-    }}
-    </style>
-    """,
-    unsafe_allow_html=True
-)
+# Theme colors and CSS
+st.markdown(theme_css(st.session_state.get("theme", DARK)), unsafe_allow_html=True)
 
 # Remove conflicting light theme CSS
 
@@ -221,11 +68,20 @@ if "data" not in st.session_state:
     st.session_state.data = None
 if "last_fetch_time" not in st.session_state:
     st.session_state.last_fetch_time = datetime.min
-if "data_cache" not in st.session_state:
-    st.session_state.data_cache = {}
+if "stale" not in st.session_state:
+    st.session_state.stale = {}
+if "chart_stream" not in st.session_state:
+    st.session_state.chart_stream = ChartStream()
+
+# Yhteinen välimuisti kaikille istunnoille
+@st.cache_resource
+def get_shared_cache():
+    return SharedCache(max_bytes=64 * 1024 * 1024)
+
+shared_cache = get_shared_cache()
 
 # Aikaväli ja mukautettu valinta
-interval_minutes_map = {"10 min": 10, "30 min": 30, "1 h": 60, "3 h": 180}
+interval_minutes_map = INTERVAL_MINUTES
 now = datetime.utcnow()
 
 
@@ -249,95 +105,140 @@ with st.sidebar:
     interval_minutes = interval_minutes_map[st.session_state.interval]
     start_time = now - timedelta(minutes=interval_minutes)
     end_time = now
+    # Miten Suomen 3 min pisteet yhdistetään Nordicin 1 s dataan
+    align_labels = {
+        "nearest": "Lähin minuutti" if lang=="Suomi" else "Nearest minute",
+        "interval": "3 min keskiarvo" if lang=="Suomi" else "3 min mean",
+        "grid": "1 min ruudukko" if lang=="Suomi" else "1 min grid",
+    }
+    align_mode = st.selectbox(
+        "Kohdistus" if lang=="Suomi" else "Alignment",
+        list(align_labels), format_func=align_labels.get, key="align_mode"
+    )
 
-    # Hae Nordicin taajuusdata
-def fetch_nordic_data():
-    try:
-        # Statnett API only supports date, not time, so fetch for the whole day
-        from_param = start_time.strftime("%Y-%m-%d")
-        url = f"https://driftsdata.statnett.no/restapi/Frequency/BySecond?From={from_param}"
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        start_point_utc = data["StartPointUTC"]
-        period_tick_ms = data["PeriodTickMs"]
-        measurements = data["Measurements"]
-        if not measurements:
-            st.warning("Nordicin datasta ei löytynyt mittauksia. Yritä myöhemmin uudelleen." if lang=="Suomi" else "No Nordic frequency measurements found. Try again later.")
-            return pd.DataFrame()
-        start_dt = datetime(1970, 1, 1) + timedelta(milliseconds=start_point_utc)
-        period_sec = period_tick_ms / 1000
-        df = pd.DataFrame(measurements, columns=["FrequencyHz"])
-        df["Timestamp"] = [start_dt + timedelta(seconds=i * period_sec) for i in range(len(df))]
-        df["Timestamp"] = pd.to_datetime(df["Timestamp"])
-        df.set_index("Timestamp", inplace=True)
-        df_resampled = df.resample("1min").mean().reset_index()
-        # Filter to selected range
-        mask = (df_resampled["Timestamp"] >= start_time) & (df_resampled["Timestamp"] <= end_time)
-        return df_resampled.loc[mask].reset_index(drop=True)
-    except requests.exceptions.Timeout:
+# Levylle tallennettu data: uudelleenkäynnistys ei hae samaa dataa uudelleen
+@st.cache_resource
+def get_store():
+    return FrequencyStore()
+
+# Nordicin koostetasot (10 s – 1 h): kuvaaja ja tilastot lukevat karkeimman riittävän tason
+@st.cache_resource
+def get_pyramid():
+    return Pyramid(keep=timedelta(days=2))
+
+# Taajuustapahtumat (ali-/ylitaajuus, RoCoF, nopea pudotus) tunnistetaan uusista 1 s näytteistä
+@st.cache_resource
+def get_event_detector():
+    return EventDetector(keep=timedelta(days=2))
+
+# Spektrit: jokaisen valmistuneen 512 s segmentin tehospektri lasketaan kerran uusista 1 s näytteistä
+@st.cache_resource
+def get_spectra():
+    return SpectralIndex(keep=timedelta(days=2))
+
+# Taustahaku: yksi palvelu per palvelinprosessi, sivu lukee vain valmiita tilannekuvia
+@st.cache_resource
+def get_ingest_service():
+    service = build_ingest(api_key, get_store(), get_pyramid(), events=get_event_detector(), spectra=get_spectra())
+    # Prometheus /metrics when FREQUENCY_METRICS_PORT is set
+    serve_metrics()
+    return service
+
+ingest = get_ingest_service()
+
+def window_rows(frame):
+    return frame[(frame["Timestamp"] >= start_time) & (frame["Timestamp"] <= end_time)].reset_index(drop=True)
+
+def stale_rows(snap):
+    # Stale-while-revalidate: the last good frame stays on screen while the worker retries
+    return snap.error is not None and snap.frame is not None and not snap.frame.empty
+
+def nordic_result(snap):
+    if snap is None:
+        st.warning("Nordicin dataa ei ole vielä haettu. Yritä hetken päästä uudelleen." if lang=="Suomi" else "Nordic frequency has not been fetched yet. Try again shortly.")
+    elif stale_rows(snap):
+        return window_rows(snap.frame)
+    elif isinstance(snap.error, requests.exceptions.Timeout):
         st.error("Nordicin datan haku aikakatkaistiin. Tarkista verkkoyhteys ja yritä uudelleen." if lang=="Suomi" else "Nordic frequency fetch timed out. Check your connection and try again.")
-        return pd.DataFrame()
-    except Exception as e:
-        st.error((f"Nordicin datan haussa tapahtui virhe: {e}. Yritä päivittää sivu tai tarkista API-palvelun tila." if lang=="Suomi" else f"Error fetching Nordic frequency: {e}. Try refreshing or check the API status."))
-        return pd.DataFrame()
-
-# Hae Suomen taajuusdata
-def fetch_finnish_data():
-    try:
-        fingrid_url = (
-            f"https://data.fingrid.fi/api/datasets/177/data?"
-            f"startTime={start_time.isoformat()}Z&endTime={end_time.isoformat()}Z"
-        )
-        headers = {"x-api-key": api_key}
-        response = requests.get(fingrid_url, headers=headers, timeout=10)
-        response.raise_for_status()
-        fi_data = response.json()
-        if "data" not in fi_data or not fi_data["data"]:
-            st.warning("Suomen datasta ei löytynyt mittauksia. Yritä myöhemmin uudelleen.")
-            return pd.DataFrame()
-        df_fi = pd.DataFrame(fi_data["data"])
-        df_fi["Timestamp"] = pd.to_datetime(df_fi["startTime"]).dt.tz_localize(None)
-        df_fi["FrequencyHz"] = df_fi["value"]
-        df_fi = df_fi[["Timestamp", "FrequencyHz"]]
-        return df_fi
-    except requests.exceptions.Timeout:
+    elif snap.error is not None:
+        st.error((f"Nordicin datan haussa tapahtui virhe: {snap.error}. Yritä päivittää sivu tai tarkista API-palvelun tila." if lang=="Suomi" else f"Error fetching Nordic frequency: {snap.error}. Try refreshing or check the API status."))
+    elif snap.frame.empty:
+        st.warning("Nordicin datasta ei löytynyt mittauksia. Yritä myöhemmin uudelleen." if lang=="Suomi" else "No Nordic frequency measurements found. Try again later.")
+    else:
+        return window_rows(snap.frame)
+    return pd.DataFrame()
+
+def finnish_result(snap):
+    if snap is None:
+        st.warning("Suomen dataa ei ole vielä haettu. Yritä hetken päästä uudelleen.")
+    elif stale_rows(snap):
+        return window_rows(snap.frame)
+    elif isinstance(snap.error, requests.exceptions.Timeout):
         st.error("Suomen datan haku aikakatkaistiin. Tarkista verkkoyhteys ja yritä uudelleen.")
-        return pd.DataFrame()
-    except Exception as e:
-        st.error(f"Suomen datan haussa tapahtui virhe: {e}. Yritä päivittää sivu tai tarkista API-palvelun tila.")
-        return pd.DataFrame()
-
-# Päivitä data
-def update_data():
-    cache_key = (str(start_time), str(end_time))
-    if cache_key in st.session_state.data_cache:
-        st.session_state.data = st.session_state.data_cache[cache_key]
-        st.session_state.last_updated = datetime.utcnow()
-        st.session_state.last_fetch_time = datetime.utcnow()
-        return
+    elif snap.error is not None:
+        st.error(f"Suomen datan haussa tapahtui virhe: {snap.error}. Yritä päivittää sivu tai tarkista API-palvelun tila.")
+    elif snap.frame.empty:
+        st.warning("Suomen datasta ei löytynyt mittauksia. Yritä myöhemmin uudelleen.")
+    else:
+        return window_rows(snap.frame)
+    return pd.DataFrame()
+
+# Kohdistus per aikaväli ja tapa: päivitys kohdistaa vain uudet rivit
+@st.cache_resource
+def get_aligner(interval, mode):
+    return Aligner(mode)
+
+def merged_for(snaps):
+    # The window ends at the newer snapshot, not at this session's clock, so every
+    # session viewing the interval shares one alignment and the aligner only moves forward
+    anchor = max(snap.end for snap in snaps.values())
+    lo = pd.Timestamp(anchor - timedelta(minutes=interval_minutes)).value
+    hi = pd.Timestamp(anchor).value
+    key = ("merged", st.session_state.interval, align_mode, anchor, snaps["nordic"].version, snaps["finnish"].version)
+    store = get_store()
+    finnish = snaps["finnish"].frame
+    fin_ts = finnish["Timestamp"].to_numpy().view("int64")
+    i, j = fin_ts.searchsorted([lo, hi + 1])
+    return shared_cache.get_or_load(
+        key,
+        lambda: get_aligner(st.session_state.interval, align_mode).update(
+            fin_ts[i:j],
+            finnish["FrequencyHz"].to_numpy()[i:j],
+            lambda lo, hi: store.read("nordic", lo, hi),
+            lo,
+            hi,
+        ),
+        ttl=CADENCE_S["finnish"],
+    )
+
+# Päivitä data (lukee taustahaun tilannekuvat, ei verkkokutsuja)
+def update_data(after_version=0):
     with st.spinner("Haetaan dataa..."):
-        df_nordic = fetch_nordic_data()
-        df_finnish = fetch_finnish_data()
-        if df_nordic.empty or df_finnish.empty:
-            st.warning("Datan haku epäonnistui tai dataa ei löytynyt. Tarkista yhteys ja yritä uudelleen.")
-            st.session_state.data = None
+        # Only blocks on a cold start or an explicit retry
+        snaps = ingest.wait_for(["nordic", "finnish"], timeout=15, after_version=after_version)
+    st.session_state.fetch_latency = {name: snap.seconds for name, snap in snaps.items() if snap is not None}
+    df_nordic = nordic_result(snaps["nordic"])
+    df_finnish = finnish_result(snaps["finnish"])
+    st.session_state.stale = {name: snap.error for name, snap in snaps.items() if snap is not None and stale_rows(snap)}
+    if df_nordic.empty or df_finnish.empty:
+        if st.session_state.data is not None:
+            # Keep showing the previous chart rather than an empty page
+            st.session_state.stale.update({name: "no data" for name, df in [("nordic", df_nordic), ("finnish", df_finnish)] if df.empty})
             return
-        df_merged = pd.merge_asof(
-            df_finnish.sort_values("Timestamp"),
-            df_nordic.sort_values("Timestamp"),
-            on="Timestamp",
-            direction="nearest",
-            suffixes=("_Suomi", "_Nordic")
-        )
-        st.session_state.data = df_merged
-        st.session_state.data_cache[cache_key] = df_merged
-        st.session_state.last_updated = datetime.utcnow()
-        st.session_state.last_fetch_time = datetime.utcnow()
+        st.warning("Datan haku epäonnistui tai dataa ei löytynyt. Tarkista yhteys ja yritä uudelleen.")
+        return
+    st.session_state.data = merged_for(snaps)
+    st.session_state.data_version = (st.session_state.interval, align_mode, snaps["nordic"].version, snaps["finnish"].version)
+    st.session_state.last_updated = min(snap.fetched_at for snap in snaps.values())
+    st.session_state.last_fetch_time = datetime.utcnow()
 
 # Automaattinen päivitys ja päivitysvälin valinta
 if 'refresh_interval' not in st.session_state:
     st.session_state.refresh_interval = 60
+# Ajastimen ja edellisen päivityksen välinen sallittu ero (s)
+REFRESH_SLACK_S = 2
+# Kuvaaja näyttää tapahtuman lisäksi tämän verran ennen ja jälkeen
+EVENT_MARGIN = timedelta(minutes=2)
 
 
 with st.sidebar:
@@ -348,26 +249,30 @@ with st.sidebar:
         "Päivitysväli (sekuntia)" if lang=="Suomi" else "Refresh interval (seconds)",
         min_value=10, max_value=600, value=st.session_state.refresh_interval, step=10
     )
+    # Suoratoisto: selain pitää kuvaajan ja saa päivityksissä vain uudet pisteet
+    st.checkbox(
+        "Suoratoisto (vain uudet pisteet)" if lang=="Suomi" else "Live streaming (new points only)",
+        value=False, key="live_stream",
+        help="Kuvaaja liukuu ajan mukana; tarkennus ja tapahtumat näytetään tavallisessa kuvaajassa." if lang=="Suomi" else "The chart slides with time; zoom and events use the regular chart."
+    )
 
-refresh_countdown = None
-if st.session_state.auto_refresh:
-    now = datetime.utcnow()
-    elapsed = (now - st.session_state.last_fetch_time).total_seconds()
-    interval = st.session_state.refresh_interval
-    refresh_countdown = max(0, int(interval - elapsed))
-    if elapsed > interval:
-        update_data()
+# Aikavälin tai kohdistuksen vaihto: kohdista heti, ei vasta seuraavalla päivityksellä
+if st.session_state.data is not None and st.session_state.data_version[:2] != (st.session_state.interval, align_mode):
+    update_data()
 
 # Haetaan data tarvittaessa ja lisää retry-nappi
 if st.session_state.data is None:
     update_data()
     if st.session_state.data is None:
         if st.button("Yritä hakea data uudelleen"):
-            update_data()
+            version = ingest.poll_now()
+            update_data(after_version=version)
+    if st.session_state.data is None:
+        st.stop()
 
-# Näytä päivityslaskuri
-if refresh_countdown is not None and st.session_state.auto_refresh:
-    st.sidebar.info(f"Seuraava päivitys: {refresh_countdown} s")
+# Live-tilan päivitysväli
+if st.session_state.auto_refresh:
+    st.sidebar.info(f"Live: päivittyy {st.session_state.refresh_interval} s välein" if lang=="Suomi" else f"Live: updates every {st.session_state.refresh_interval} s")
 
 
 st.markdown("---")
@@ -381,6 +286,7 @@ with st.expander("ℹ️ Ohjeet ja tietoa" if lang=="Suomi" else "ℹ️ Help &
 
 **Päivitys:**
 - Data päivittyy automaattisesti valitulla aikavälillä, tai voit päivittää manuaalisesti.
+- Suoratoistossa selain pitää kuvaajan ja saa päivityksissä vain uudet pisteet (sopii jatkuvasti auki oleville näytöille).
 
 **Kuvaajan tulkinta:**
 - Punainen alue: taajuus alle 49.95 Hz (alhainen)
@@ -395,6 +301,7 @@ with st.expander("ℹ️ Ohjeet ja tietoa" if lang=="Suomi" else "ℹ️ Help &
 
 **Refresh:**
 - Data refreshes automatically at the selected interval, or you can refresh manually.
+- With live streaming the browser keeps the chart and only receives new points (suited to screens left open around the clock).
 
 **Chart interpretation:**
 - Red area: frequency below 49.95 Hz (low)
@@ -403,183 +310,265 @@ with st.expander("ℹ️ Ohjeet ja tietoa" if lang=="Suomi" else "ℹ️ Help &
         """)
 
 
-# Show chart
-df_merged = st.session_state.data
-
-# Convert timestamps to Helsinki time
-helsinki_tz = pytz.timezone("Europe/Helsinki")
-df_merged["Timestamp_local"] = df_merged["Timestamp"].dt.tz_localize("UTC").dt.tz_convert(helsinki_tz)
-
-
-
-# Colors are now set by theme selection above
-
-# Draw chart
-fig = go.Figure()
-
-# Warning areas
-x_start = df_merged["Timestamp_local"].min()
-x_end = df_merged["Timestamp_local"].max()
-y_min = df_merged[["FrequencyHz_Suomi", "FrequencyHz_Nordic"]].min().min()
-y_max = df_merged[["FrequencyHz_Suomi", "FrequencyHz_Nordic"]].max().max()
-y_axis_min = y_min - 0.05
-y_axis_max = y_max + 0.05
-
-fig.add_shape(
-    type="rect", xref="x", yref="y",
-    x0=x_start, x1=x_end,
-    y0=y_axis_min, y1=min(49.95, y_axis_max),
-    fillcolor="rgba(255,82,82,0.13)", line_width=0, layer="below"
-)
-fig.add_shape(
-    type="rect", xref="x", yref="y",
-    x0=x_start, x1=x_end,
-    y0=max(50.05, y_axis_min), y1=y_axis_max,
-    fillcolor="rgba(66,165,245,0.13)", line_width=0, layer="below"
-)
-
-# Nordic frequency
-fig.add_trace(go.Scatter(
-    x=df_merged["Timestamp_local"],
-    y=df_merged["FrequencyHz_Nordic"],
-    mode="lines+markers",
-    name="Nordic (1 min)",
-    line=dict(color=color_nordic, width=3),
-    marker=dict(size=7, symbol="circle"),
-    visible=True,
-    hovertemplate=("Aika: %{x}<br>Nordic: %{y:.3f} Hz<extra></extra>" if lang=="Suomi" else "Time: %{x}<br>Nordic: %{y:.3f} Hz<extra></extra>")
-))
-
-# Finland frequency
-fig.add_trace(go.Scatter(
-    x=df_merged["Timestamp_local"],
-    y=df_merged["FrequencyHz_Suomi"],
-    mode="lines+markers",
-    name="Suomi (3 min)" if lang=="Suomi" else "Finland (3 min)",
-    line=dict(color=color_finland, width=3),
-    marker=dict(size=7, symbol="diamond"),
-    visible=True,
-    hovertemplate=("Aika: %{x}<br>Suomi: %{y:.3f} Hz<extra></extra>" if lang=="Suomi" else "Time: %{x}<br>Finland: %{y:.3f} Hz<extra></extra>")
-))
-
-# Axes and layout
-import streamlit as st
-# ...existing code...
-fig.update_layout(
-    xaxis=dict(
-        title=dict(text="Aika (Suomen aika)" if lang=="Suomi" else "Time (Helsinki)", font=dict(size=22)),
-        tickformat="%H:%M",
-        domain=[0.0, 1.0],
-        anchor="y",
-        tickfont=dict(size=18),
-        fixedrange=False  # allow zoom/pan
-    ),
-    xaxis2=dict(
-        title=dict(text="Aika (UTC)" if lang=="Suomi" else "Time (UTC)", font=dict(size=20)),
-        overlaying="x",
-        side="top",
-        tickvals=df_merged["Timestamp_local"],
-        ticktext=df_merged["Timestamp"].dt.strftime("%H:%M"),
-        showgrid=False,
-        tickfont=dict(size=16),
-        fixedrange=False
-    ),
-    yaxis=dict(
-        title=dict(text="Taajuus (Hz)" if lang=="Suomi" else "Frequency (Hz)", font=dict(size=22)),
-        range=[y_axis_min, y_axis_max],
-        tickfont=dict(size=18),
-        fixedrange=False
-    ),
-    dragmode="zoom",  # allow box zoom (both axes)
-    height=1100,
-    margin=dict(t=60, b=40, l=60, r=40),
-    legend=dict(
-        orientation="h",
-        yanchor="bottom",
-        y=1.02,
-        xanchor="right",
-        x=1,
-        font=dict(size=18)
-    ),
-    title=dict(
-        text="Taajuusvertailu: Nordic (1 min) & Suomi (3 min)" if lang=="Suomi" else "Frequency Comparison: Nordic (1 min) & Finland (3 min)",
-        font=dict(size=26)
-    ),
-    plot_bgcolor=plot_bg,
-    paper_bgcolor=plot_paper
-)
-
+# Summary statistics
+def write_summary(summary, extremes_label=""):
+    if summary is None or summary["count"] == 0:
+        st.write("Ei dataa." if lang=="Suomi" else "No data.")
+        return
+    st.write(f"Min{extremes_label}: {summary['min']:.3f} Hz")
+    st.write(f"Max{extremes_label}: {summary['max']:.3f} Hz")
+    st.write(f"Keskiarvo: {summary['mean']:.3f} Hz" if lang=="Suomi" else f"Mean: {summary['mean']:.3f} Hz")
+    st.write(f"Keskihajonta: {summary['std']:.3f} Hz" if lang=="Suomi" else f"Std: {summary['std']:.3f} Hz")
+    band = f"{BAND_LOW:.2f}–{BAND_HIGH:.2f} Hz"
+    st.write(f"Aika alueen {band} ulkopuolella: {summary['outside_s']:.0f} s" if lang=="Suomi" else f"Time outside {band}: {summary['outside_s']:.0f} s")
+    st.write(f"Pisin poikkeama: {summary['longest_s']:.0f} s" if lang=="Suomi" else f"Longest excursion: {summary['longest_s']:.0f} s")
+    st.write(f"Poistumiset alueelta: {summary['crossings']}" if lang=="Suomi" else f"Band exits: {summary['crossings']}")
+
+# Live-tila: ajastettu päivitys ajaa vain tämän osan (data, kuvaaja, yhteenveto),
+# teema, sivupalkki ja ohjeet jäävät ennalleen
+@st.fragment(run_every=st.session_state.refresh_interval if st.session_state.auto_refresh else None)
+def live_view():
+    global now, start_time, end_time
+    if st.session_state.auto_refresh:
+        now = datetime.utcnow()
+        start_time, end_time = now - timedelta(minutes=interval_minutes), now
+        elapsed = (now - st.session_state.last_fetch_time).total_seconds()
+        # The timer fires one interval after the last refresh started, so allow for its duration
+        if elapsed > st.session_state.refresh_interval - REFRESH_SLACK_S:
+            update_data()
 
-# Toggle traces (legend click is default in Plotly, but add checkboxes for clarity)
-with st.expander("Näytä/piilota käyrät kuvaajassa" if lang=="Suomi" else "Show/hide curves in chart"):
-    show_nordic = st.checkbox("Näytä Nordic", value=True)
-    show_suomi = st.checkbox("Näytä Suomi" if lang=="Suomi" else "Show Finland", value=True)
-fig.data[0].visible = show_nordic
-fig.data[1].visible = show_suomi
-
-st.plotly_chart(
-    fig,
-    use_container_width=True,
-    config={
-        "displayModeBar": True,
-        "modeBar": {
-            "orientation": "h"
-        },
-        "displaylogo": False,
-        "modeBarButtonsToRemove": [],
-        "toImageButtonOptions": {
-            "format": "png",
-            "filename": "frequency_chart",
-            "height": 800,
-            "width": 1200,
-            "scale": 2
-        }
-    }
-)
+    # Vanhentunut data: näytetään viimeisin onnistunut haku, päivitys jatkuu taustalla
+    if st.session_state.stale:
+        names = ", ".join({"nordic": "Statnett", "finnish": "Fingrid"}[name] for name in st.session_state.stale)
+        reason = "; ".join(str(e) for e in st.session_state.stale.values())
+        updated = st.session_state.last_updated.strftime("%H:%M:%S") if st.session_state.last_updated else "?"
+        st.warning(
+            f"⏳ {names} ei vastaa juuri nyt: näytetään viimeisin onnistunut data ({updated} UTC). Päivitys jatkuu taustalla. ({reason})"
+            if lang=="Suomi" else
+            f"⏳ {names} is not responding: showing the last good data ({updated} UTC) while it keeps retrying in the background. ({reason})"
+        )
 
-# Custom CSS to move and enlarge the Plotly modebar above the chart, right-aligned
-st.markdown(
-    """
-    <style>
-    .stPlotlyChart {
-        position: relative;
-    }
-    .modebar {
-        position: absolute !important;
-        top: -60px !important;
-        right: 0 !important;
-        left: auto !important;
-        margin-right: 0 !important;
-        margin-top: 0 !important;
-        zoom: 1.35;
-        background: transparent !important;
-        box-shadow: none !important;
+    # Show chart
+    df_merged = st.session_state.data
+
+    # Toggle traces (legend click is default in Plotly, but add checkboxes for clarity)
+    local_start, local_end = (t.tz_localize(None).to_pydatetime() for t in to_local([df_merged["Timestamp"].min(), df_merged["Timestamp"].max()]))
+    with st.expander("Näytä/piilota käyrät kuvaajassa" if lang=="Suomi" else "Show/hide curves in chart"):
+        show_nordic = st.checkbox("Näytä Nordic", value=True)
+        show_suomi = st.checkbox("Näytä Suomi" if lang=="Suomi" else "Show Finland", value=True)
+        show_raw = st.checkbox("Näytä Nordic 1 s" if lang=="Suomi" else "Show Nordic 1 s", value=False)
+        # Zooming re-reads the 1 s data for the narrower range at a finer resolution
+        zoom = (local_start, local_end)
+        if local_start < local_end:
+            zoom = st.slider(
+                "Tarkenna aikaväliä" if lang=="Suomi" else "Zoom to range",
+                min_value=local_start, max_value=local_end, value=(local_start, local_end), format="HH:mm"
+            )
+    zoom = zoom if zoom != (local_start, local_end) else None
+
+    # Tapahtumat luetaan indeksistä: raakadataa ei käydä uudelleen läpi
+    events = get_event_detector().index.between(pd.Timestamp(start_time).value, pd.Timestamp(end_time).value + 1)
+    event_names = {
+        "low": "Alitaajuus" if lang=="Suomi" else "Under-frequency",
+        "high": "Ylitaajuus" if lang=="Suomi" else "Over-frequency",
+        "rocof": "Nopea muutos (RoCoF)" if lang=="Suomi" else "RoCoF spike",
+        "drop": "Nopea pudotus" if lang=="Suomi" else "Fast drop",
     }
-    </style>
-    """,
-    unsafe_allow_html=True
-)
-
-# Summary statistics
-with st.expander("📈 Yhteenveto valitulta aikaväliltä" if lang=="Suomi" else "📈 Summary for selected period"):
-    st.write("**Nordic**")
-    if show_nordic and not df_merged["FrequencyHz_Nordic"].isnull().all():
-        st.write(f"Min: {df_merged['FrequencyHz_Nordic'].min():.3f} Hz")
-        st.write(f"Max: {df_merged['FrequencyHz_Nordic'].max():.3f} Hz")
-        st.write(f"Keskiarvo: {df_merged['FrequencyHz_Nordic'].mean():.3f} Hz" if lang=="Suomi" else f"Mean: {df_merged['FrequencyHz_Nordic'].mean():.3f} Hz")
-        st.write(f"Keskihajonta: {df_merged['FrequencyHz_Nordic'].std():.3f} Hz" if lang=="Suomi" else f"Std: {df_merged['FrequencyHz_Nordic'].std():.3f} Hz")
-    else:
-        st.write("Ei dataa." if lang=="Suomi" else "No data.")
-    st.write("**Suomi**" if lang=="Suomi" else "**Finland**")
-    if show_suomi and not df_merged["FrequencyHz_Suomi"].isnull().all():
-        st.write((f"Min: {df_merged['FrequencyHz_Suomi'].min():.3f} Hz" if lang=="Suomi" else f"Min: {df_merged['FrequencyHz_Suomi'].min():.3f} Hz"))
-        st.write((f"Max: {df_merged['FrequencyHz_Suomi'].max():.3f} Hz" if lang=="Suomi" else f"Max: {df_merged['FrequencyHz_Suomi'].max():.3f} Hz"))
-        st.write((f"Keskiarvo: {df_merged['FrequencyHz_Suomi'].mean():.3f} Hz" if lang=="Suomi" else f"Mean: {df_merged['FrequencyHz_Suomi'].mean():.3f} Hz"))
-        st.write((f"Keskihajonta: {df_merged['FrequencyHz_Suomi'].std():.3f} Hz" if lang=="Suomi" else f"Std: {df_merged['FrequencyHz_Suomi'].std():.3f} Hz"))
+    event = None
+    with st.expander(f"⚡ Tapahtumat ({len(events)})" if lang=="Suomi" else f"⚡ Events ({len(events)})"):
+        if events.empty:
+            st.write("Ei tapahtumia valitulla aikavälillä." if lang=="Suomi" else "No events in the selected period.")
+        else:
+            events["label"] = [
+                f"{t:%H:%M:%S} · {event_names[k]} · {x:.3f} Hz · {d:.0f} s"
+                for t, k, x, d in zip(to_local(events["start"]), events["kind"], events["extreme"], events["duration_s"])
+            ]
+            st.dataframe(pd.DataFrame({
+                "Alku" if lang=="Suomi" else "Start": to_local(events["start"]).strftime("%H:%M:%S"),
+                "Tyyppi" if lang=="Suomi" else "Type": events["kind"].map(event_names),
+                "Kesto (s)" if lang=="Suomi" else "Duration (s)": events["duration_s"],
+                "Ääriarvo (Hz)" if lang=="Suomi" else "Extreme (Hz)": events["extreme"],
+            }), hide_index=True, use_container_width=True)
+            choice = st.selectbox(
+                "Siirry tapahtumaan" if lang=="Suomi" else "Jump to event",
+                [None] + events["label"].tolist(),
+                format_func=lambda label: "—" if label is None else label,
+                key="event_choice",
+            )
+            if choice is not None:
+                event = events[events["label"] == choice].iloc[0]
+    if event is not None:
+        # Tapahtuma marginaaleineen ja Nordicin 1 s data näkyviin
+        event_start, event_end = (t.tz_localize(None).to_pydatetime() for t in to_local([event["start"] - EVENT_MARGIN, event["end"] + EVENT_MARGIN]))
+        zoom = (event_start, event_end)
+        show_raw = True
+
+    streaming = st.session_state.live_stream and zoom is None and event is None
+    if streaming:
+        # Selain laajentaa kuvaajaa: lähetetään vain edellisen päivityksen jälkeiset pisteet
+        nordic_snap, finnish_snap = ingest.snapshot("nordic"), ingest.snapshot("finnish")
+        nordic_frame = nordic_snap.frame if nordic_snap is not None and nordic_snap.frame is not None else pd.DataFrame()
+        finnish_frame = finnish_snap.frame if finnish_snap is not None and finnish_snap.frame is not None else pd.DataFrame()
+        chart_theme = st.session_state.get("theme", DARK)
+        readers = [
+            # The newest minute may still be incomplete: it is sent once the next one starts
+            frame_reader(nordic_frame.iloc[:-1]),
+            frame_reader(finnish_frame),
+        ]
+        if show_raw:
+            readers.append(lambda lo, hi: get_store().read("nordic", lo, hi))
+        with span("live_chart"):
+            live_chart(
+                st.session_state.chart_stream,
+                (lang, chart_theme, show_nordic, show_suomi, show_raw, st.session_state.interval),
+                lambda: stream_figure(lang, chart_colors(chart_theme), show_nordic, show_suomi, show_raw),
+                readers,
+                pd.Timestamp(start_time).value,
+                pd.Timestamp(end_time).value + 1,
+                interval_minutes * 60_000,
+                key="live_chart",
+            )
     else:
-        st.write("Ei dataa." if lang=="Suomi" else "No data.")
-
-if st.session_state.last_updated:
-    st.caption(f"Viimeisin päivitys: {st.session_state.last_updated.strftime('%H:%M:%S')} UTC")
+        # The component is not on the page: it starts from a whole figure next time
+        st.session_state.chart_stream.reset()
+
+        def build_chart():
+            detail = None
+            if show_raw:
+                # Finest Nordic resolution that still fits the chart width: 1 s samples or a min-max level
+                detail_start, detail_end = zoom or (local_start, local_end)
+                detail_start, detail_end = local_to_utc(detail_start), local_to_utc(detail_end)
+                detail = detail_frame(get_pyramid(), get_store(), "nordic", detail_start.value, detail_end.value + 60 * 10**9, CHART_POINTS)
+            colors = chart_colors(st.session_state.get("theme", DARK))
+            with span("build_figure"):
+                return build_figure(df_merged, lang, colors, show_nordic, show_suomi, detail, zoom, nordic_mean="3 min" if align_mode == "interval" else "1 min")
+
+        # The figure only changes with the data, theme, language or chart options,
+        # so reruns from other widgets reuse the cached one
+        fig_key = ("figure", st.session_state.data_version, st.session_state.get("theme"), lang, show_nordic, show_suomi, show_raw, zoom)
+        fig = shared_cache.get_or_load(fig_key, build_chart, ttl=CADENCE_S["finnish"])
+
+        # Includes Plotly's JSON serialization of the figure
+        with span("plotly_chart"):
+            st.plotly_chart(
+                fig,
+                use_container_width=True,
+                config={
+                    "displayModeBar": True,
+                    "modeBar": {
+                        "orientation": "h"
+                    },
+                    "displaylogo": False,
+                    "modeBarButtonsToRemove": [],
+                    "toImageButtonOptions": {
+                        "format": "png",
+                        "filename": "frequency_chart",
+                        "height": 800,
+                        "width": 1200,
+                        "scale": 2
+                    }
+                }
+            )
+
+    with st.expander("📈 Yhteenveto valitulta aikaväliltä" if lang=="Suomi" else "📈 Summary for selected period"):
+        st.write("**Nordic**")
+        if show_nordic:
+            # Exact statistics of the 1 s samples from the pyramid, not of the minute means
+            nordic_summary = get_pyramid().summary(*minute_range_ns(start_time, end_time))
+            if nordic_summary is not None and nordic_summary["count"] > 0:
+                write_summary(nordic_summary, " (1 s)")
+            else:
+                write_summary(describe(df_merged["FrequencyHz_Nordic"].to_numpy(), period_s=60))
+        else:
+            write_summary(None)
+        st.write("**Suomi**" if lang=="Suomi" else "**Finland**")
+        finnish_snap = ingest.snapshot("finnish")
+        if show_suomi and finnish_snap is not None and not finnish_snap.frame.empty:
+            # Fingrid's own 3 min points; the merged frame repeats them for every minute
+            write_summary(describe(window_rows(finnish_snap.frame)["FrequencyHz"].to_numpy(), period_s=CADENCE_S["finnish"]))
+        else:
+            write_summary(None)
+
+    # Spektri ja kaistatehot Nordicin 1 s datasta: välimuistissa olevat segmentit keskiarvoistetaan
+    with st.expander("🔬 Spektri ja värähtelyt" if lang=="Suomi" else "🔬 Spectrum & oscillations"):
+        band_labels = {
+            "slow": "Hidas (tasapaino)" if lang=="Suomi" else "Slow (balancing)",
+            "governor": "Säätäjät (FCR)" if lang=="Suomi" else "Governor (FCR)",
+            "inter_area": "Alueiden välinen" if lang=="Suomi" else "Inter-area",
+            "custom": "Oma kaista" if lang=="Suomi" else "Custom band",
+        }
+        chosen = st.multiselect(
+            "Taajuuskaistat" if lang=="Suomi" else "Frequency bands",
+            list(BANDS), default=list(BANDS), format_func=band_labels.get, key="spectral_bands"
+        )
+        bands = {name: BANDS[name] for name in chosen}
+        if st.checkbox("Lisää oma kaista" if lang=="Suomi" else "Add a custom band", value=False, key="spectral_custom"):
+            bands["custom"] = st.slider(
+                "Oma kaista (Hz)" if lang=="Suomi" else "Custom band (Hz)",
+                min_value=0.002, max_value=0.5, value=(0.02, 0.05), step=0.001, format="%.3f"
+            )
+        spectra = get_spectra()
+        spectral_start, spectral_stop = minute_range_ns(start_time, end_time)
+
+        def build_spectral():
+            freqs, psd, segments = spectra.welch(spectral_start, spectral_stop)
+            if psd is None:
+                return None
+            colors = chart_colors(st.session_state.get("theme", DARK))
+            return (
+                spectrum_figure(freqs, psd, lang, colors, bands, band_labels, segments),
+                band_power_figure(spectra.band_power(spectral_start, spectral_stop, bands), lang, colors, band_labels),
+            )
+
+        # New figures only when segments were added or the window moved by a segment step
+        spectral_key = (
+            "spectral", spectra.version, spectral_start // (STEP_S * 10**9), st.session_state.interval,
+            st.session_state.get("theme"), lang, tuple(bands.items()),
+        )
+        figures = shared_cache.get_or_load(spectral_key, build_spectral, ttl=CADENCE_S["nordic"])
+        if figures is None:
+            st.write(
+                f"Spektriin tarvitaan vähintään {SEGMENT_S} s yhtenäistä 1 s dataa valitulta aikaväliltä." if lang=="Suomi"
+                else f"The spectrum needs at least {SEGMENT_S} s of continuous 1 s data in the selected period."
+            )
+        else:
+            st.plotly_chart(figures[0], use_container_width=True)
+            st.plotly_chart(figures[1], use_container_width=True)
+            st.caption(
+                f"Welch: {SEGMENT_S} s Hann-segmentit {STEP_S} s välein; kaistateho on segmentin RMS-vaihtelu kaistalla." if lang=="Suomi"
+                else f"Welch: {SEGMENT_S} s Hann segments every {STEP_S} s; band power is each segment's RMS variation in the band."
+            )
+
+    if st.session_state.last_updated:
+        st.caption(f"Viimeisin päivitys: {st.session_state.last_updated.strftime('%H:%M:%S')} UTC")
+    if st.session_state.get("fetch_latency"):
+        latency = st.session_state.fetch_latency
+        st.caption(" · ".join(
+            f"{label} {latency[name]:.2f} s" for name, label in [("nordic", "Statnett"), ("finnish", "Fingrid")] if name in latency
+        ))
+
+live_view()
+
+# Plotly modebar above the chart, right-aligned
+st.markdown(MODEBAR_CSS, unsafe_allow_html=True)
+
+# Diagnostiikka: vaiheiden ajat, välimuistin osumat ja siirretty data
+with st.sidebar:
+    if st.checkbox("Diagnostiikka" if lang=="Suomi" else "Diagnostics", value=False):
+        stages = pd.DataFrame(registry.latency_rows(STAGE_SECONDS))
+        if not stages.empty:
+            st.caption("Vaiheet (ms)" if lang=="Suomi" else "Stages (ms)")
+            st.dataframe(stages.set_index("stage").round(1), use_container_width=True)
+        upstream = pd.DataFrame(registry.latency_rows(UPSTREAM_SECONDS))
+        if not upstream.empty:
+            sent = {dict(labels)["host"]: v for labels, v in registry.counters(UPSTREAM_BYTES).items()}
+            upstream["MB"] = upstream["host"].map(sent).fillna(0) / 1e6
+            st.caption("Lähteet (ms)" if lang=="Suomi" else "Upstream (ms)")
+            st.dataframe(upstream.set_index("host").round(2), use_container_width=True)
+        cache = registry.counters(CACHE_REQUESTS)
+        if cache:
+            cache = pd.DataFrame([{**dict(labels), "n": v} for labels, v in cache.items()])
+            st.caption("Välimuisti" if lang=="Suomi" else "Cache")
+            st.dataframe(cache.pivot(index="cache", columns="result", values="n").fillna(0).astype(int), use_container_width=True)
 
 # Remove settings menu (no replacement needed)
@@ -0,0 +1,104 @@
+"""Micro-benchmark: per-refresh cost of aligning Fingrid with Statnett data.
+
+A live window is advanced 30 s per refresh (30 new 1 s samples, a new
+Fingrid point every 3 min) and each refresh is timed for:
+
+- ``merge_asof``: minute means of the whole window and ``merge_frames``
+  reusing the previous result, as the dashboard did before
+- ``<mode> full``: ``align`` of the whole window from scratch
+- ``<mode>``: an ``Aligner`` that only aligns the new rows
+
+The incremental times should stay flat as the window grows. Run from the
+repository root::
+
+    python -m benchmarks.bench_align
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from frequency.align import MODES, Aligner, align
+from frequency.transform import merge_frames, minute_frame
+
+S_NS = 1_000_000_000
+STEP_S = 30
+WINDOWS = ("1h", "3h", "12h", "2D", "7D")
+
+
+def synthetic(days, seed=0):
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2024-01-01").value
+    n = days * 86_400
+    nordic_ts = start + np.arange(n, dtype=np.int64) * S_NS
+    nordic = 50 + 0.05 * np.sin(np.arange(n) / 900) + rng.normal(0, 0.004, n)
+    nordic[::5000] = np.nan
+    fin_ts = nordic_ts[::180]
+    fin = nordic[::180] + rng.normal(0, 0.01, len(fin_ts))
+    return nordic_ts, nordic.round(3), fin_ts, fin.round(2)
+
+
+def refreshes(window_ns, end_ns, count):
+    """``(start, end)`` of ``count`` refreshes ending at ``end_ns``."""
+    for i in range(count):
+        stop = end_ns - (count - 1 - i) * STEP_S * S_NS
+        yield stop - window_ns, stop
+
+
+def median_ms(times):
+    return float(np.median(times)) * 1000
+
+
+def main(count=20):
+    nordic_ts, nordic, fin_ts, fin = synthetic(8)
+    end_ns = int(nordic_ts[-1])
+
+    def visible(lo, hi):
+        # Published up to ``hi``; Fingrid points show up once their 3 min period is over
+        i, j = np.searchsorted(nordic_ts, [lo, hi + 1])
+        k, m = np.searchsorted(fin_ts, [lo, hi - 180 * S_NS + 1])
+        return nordic_ts[i:j], nordic[i:j], fin_ts[k:m], fin[k:m]
+
+    print(f"{'window':>8}{'merge_asof':>12}" + "".join(f"{m + ' full':>16}{m:>10}" for m in MODES) + "   (ms per refresh)")
+    for label in WINDOWS:
+        window_ns = pd.Timedelta(label).value
+        runs = list(refreshes(window_ns, end_ns, count))
+        row = []
+
+        previous, times = None, []
+        for lo, hi in runs:
+            n_ts, n_v, f_ts, f_v = visible(lo, hi)
+            t0 = time.perf_counter()
+            df_finnish = pd.DataFrame({"Timestamp": f_ts.view("datetime64[ns]"), "FrequencyHz": f_v})
+            previous = merge_frames(df_finnish, minute_frame(n_ts, n_v), previous=previous)
+            times.append(time.perf_counter() - t0)
+        row.append(median_ms(times))
+
+        for mode in MODES:
+            full, incremental = [], []
+            aligner = Aligner(mode)
+            # Warm up on the window before the first timed refresh
+            lo, hi = runs[0]
+            n_ts, n_v, f_ts, f_v = visible(lo - STEP_S * S_NS, hi - STEP_S * S_NS)
+            aligner.update(f_ts, f_v, lambda a, b: _slice(n_ts, n_v, a, b), lo - STEP_S * S_NS, hi - STEP_S * S_NS)
+            for lo, hi in runs:
+                n_ts, n_v, f_ts, f_v = visible(lo, hi)
+                t0 = time.perf_counter()
+                expected = align(mode, f_ts, f_v, n_ts, n_v, lo, hi)
+                full.append(time.perf_counter() - t0)
+                t0 = time.perf_counter()
+                result = aligner.update(f_ts, f_v, lambda a, b: _slice(n_ts, n_v, a, b), lo, hi)
+                incremental.append(time.perf_counter() - t0)
+            np.testing.assert_allclose(result.iloc[:, 1:].to_numpy(), expected.iloc[:, 1:].to_numpy())
+            row += [median_ms(full), median_ms(incremental)]
+        print(f"{label:>8}{row[0]:>12.2f}" + "".join(f"{f:>16.2f}{i:>10.2f}" for f, i in zip(row[1::2], row[2::2])))
+
+
+def _slice(ts, values, lo, hi):
+    # Stands in for FrequencyStore.read on the published samples
+    i, j = np.searchsorted(ts, [lo, hi])
+    return ts[i:j], values[i:j]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Micro-benchmark: BySecond ingestion, old row-wise path vs. columnar path.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_ingest
+"""
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from frequency.transform import nordic_frame
+
+DAY_SAMPLES = 86_400
+
+
+def synthetic_payload(n=DAY_SAMPLES, seed=0):
+    rng = np.random.default_rng(seed)
+    start = int(pd.Timestamp("2024-01-01").value // 1_000_000)
+    values = 50 + np.cumsum(rng.normal(0, 0.002, n)).clip(-0.2, 0.2)
+    return {"StartPointUTC": start, "PeriodTickMs": 1000, "Measurements": values.round(3).tolist()}
+
+
+def legacy_frame(data):
+    # The path fetch_nordic_data() used before the columnar rewrite
+    start_dt = datetime(1970, 1, 1) + timedelta(milliseconds=data["StartPointUTC"])
+    period_sec = data["PeriodTickMs"] / 1000
+    df = pd.DataFrame(data["Measurements"], columns=["FrequencyHz"])
+    df["Timestamp"] = [start_dt + timedelta(seconds=i * period_sec) for i in range(len(df))]
+    df["Timestamp"] = pd.to_datetime(df["Timestamp"])
+    df.set_index("Timestamp", inplace=True)
+    return df.resample("1min").mean().reset_index()
+
+
+def best_of(fn, arg, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(arg)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main(repeat=5):
+    payload = synthetic_payload()
+    t_old, df_old = best_of(legacy_frame, payload, repeat)
+    t_new, df_new = best_of(nordic_frame, payload, repeat)
+    np.testing.assert_allclose(df_old["FrequencyHz"].to_numpy(), df_new["FrequencyHz"].to_numpy())
+    assert (df_old["Timestamp"].to_numpy("datetime64[ns]") == df_new["Timestamp"].to_numpy()).all()
+    print(f"samples:  {len(payload['Measurements'])}")
+    print(f"legacy:   {t_old * 1000:8.1f} ms")
+    print(f"columnar: {t_new * 1000:8.1f} ms")
+    print(f"speedup:  {t_old / t_new:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
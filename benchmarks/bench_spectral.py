@@ -0,0 +1,82 @@
+"""Micro-benchmark: per-refresh cost of the spectral view on the 1 s Nordic data.
+
+A live window is advanced 30 s per refresh (30 new 1 s samples) and each
+refresh is timed for:
+
+- ``full``: periodograms of every segment in the window from scratch, then
+  Welch's PSD and band power
+- ``incremental``: a ``SpectralIndex`` fed the new samples, then Welch's
+  PSD and band power from the stored segments
+
+The incremental time should stay flat as the window grows. Run from the
+repository root::
+
+    python -m benchmarks.bench_spectral
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from frequency.spectral import BANDS, SEGMENT_S, STEP_S, SpectralIndex, frequencies, periodograms
+
+S_NS = 1_000_000_000
+STEP_REFRESH_S = 30
+WINDOWS = ("1h", "3h", "12h", "1D")
+
+
+def synthetic(days, seed=0):
+    rng = np.random.default_rng(seed)
+    n = days * 86_400
+    t = np.arange(n)
+    # Governor-band and inter-area oscillations on top of noise
+    values = 50 + 0.01 * np.sin(2 * np.pi * 0.03 * t) + 0.002 * np.sin(2 * np.pi * 0.25 * t) + rng.normal(0, 0.003, n)
+    values[::5000] = np.nan
+    return pd.Timestamp("2024-01-01").value + t.astype(np.int64) * S_NS, values
+
+
+def full(ts, values, lo, hi):
+    # Segments on the same fixed grid as SpectralIndex
+    step_ns = STEP_S * S_NS
+    i = int(np.searchsorted(ts, -(-lo // step_ns) * step_ns))
+    j = int(np.searchsorted(ts, hi))
+    block = values[i:j]
+    block = np.where(np.isnan(block), np.nanmean(block), block)
+    psd = periodograms(block)
+    freqs = frequencies()
+    df_hz = freqs[1] - freqs[0]
+    bands = {name: psd[:, (freqs >= low) & (freqs < high)].sum(axis=1) * df_hz for name, (low, high) in BANDS.items()}
+    return psd.mean(axis=0), bands
+
+
+def median_ms(times):
+    return float(np.median(times)) * 1000
+
+
+def main(count=20):
+    ts, values = synthetic(2)
+    end = len(ts)
+    print(f"{'window':>8}{'segments':>10}{'full':>10}{'incremental':>13}   (ms per refresh)")
+    for label in WINDOWS:
+        window = pd.Timedelta(label).value // S_NS
+        stops = [end - (count - 1 - k) * STEP_REFRESH_S for k in range(count)]
+        index = SpectralIndex("2D")
+        # Warm up: the index already holds the window before the first timed refresh
+        index.update(ts[stops[0] - window - STEP_REFRESH_S:stops[0] - STEP_REFRESH_S], values[stops[0] - window - STEP_REFRESH_S:stops[0] - STEP_REFRESH_S])
+        full_times, incremental_times = [], []
+        for stop in stops:
+            lo, hi = int(ts[stop - window]), int(ts[stop - 1]) + S_NS
+            t0 = time.perf_counter()
+            full(ts, values, lo, hi)
+            full_times.append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            index.update(ts[stop - STEP_REFRESH_S:stop], values[stop - STEP_REFRESH_S:stop])
+            _, psd, segments = index.welch(lo, hi)
+            index.band_power(lo, hi)
+            incremental_times.append(time.perf_counter() - t0)
+        print(f"{label:>8}{segments:>10}{median_ms(full_times):>10.2f}{median_ms(incremental_times):>13.2f}")
+    print(f"segments of {SEGMENT_S} s every {STEP_S} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Deterministic Statnett and Fingrid payloads for offline benchmarks.
+
+The payloads have the exact shape of the live APIs: a full-day BySecond
+response (86,400 samples, with a few missing ones) per day, and Fingrid
+dataset 177 rows at 3 min spacing. Values are slow oscillations plus
+seeded noise around 50 Hz, so every run serves byte-identical responses.
+"""
+import numpy as np
+import pandas as pd
+
+DAY_SAMPLES = 86_400
+FINGRID_STEP = pd.Timedelta("3min")
+# The benchmark clock: all windows end here
+END = pd.Timestamp("2024-01-02 12:00")
+DAYS = ("2024-01-01", "2024-01-02")
+# Fingrid response sizes (rows) measured besides the chart intervals
+FINGRID_SIZES = (480, 2880, 20_000, 100_000)
+# Fingrid API page size when none is asked for, and the largest allowed
+FINGRID_PAGE_SIZE = 10
+FINGRID_MAX_PAGE_SIZE = 20_000
+
+
+def _walk(n, seed, step):
+    # Stays within about +-0.2 Hz however long the series, unlike a random walk
+    rng = np.random.default_rng(seed)
+    t = np.arange(n) / n
+    slow = 0.06 * np.sin(2 * np.pi * 7 * t) + 0.03 * np.sin(2 * np.pi * 61 * t + 1.0)
+    return 50 + slow + rng.normal(0, step * 2, n)
+
+
+def bysecond_payload(day, seed=0):
+    """Full-day BySecond response starting at midnight UTC of ``day``."""
+    values = _walk(DAY_SAMPLES, seed, 0.002).round(3).tolist()
+    for i in range(1000, DAY_SAMPLES, 20_000):
+        values[i] = None
+    start_ms = pd.Timestamp(day).value // 1_000_000
+    return {"StartPointUTC": start_ms, "EndPointUTC": start_ms + DAY_SAMPLES * 1000, "PeriodTickMs": 1000, "Measurements": values}
+
+
+def fingrid_rows(n=max(FINGRID_SIZES), end=END, seed=1):
+    """The ``n`` dataset 177 rows up to ``end``, oldest first."""
+    ts = pd.date_range(end=end.floor("3min"), periods=n, freq=FINGRID_STEP)
+    values = _walk(n, seed, 0.01).round(2)
+    return [
+        {
+            "datasetId": 177,
+            "startTime": t.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+            "endTime": (t + FINGRID_STEP).strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+            "value": float(v),
+        }
+        for t, v in zip(ts, values)
+    ]
+
+
+def fingrid_payload(rows, page=1, page_size=FINGRID_PAGE_SIZE):
+    """Page ``page`` of ``rows`` with the API's pagination metadata."""
+    last_page = max(-(-len(rows) // page_size), 1)
+    lo = (page - 1) * page_size
+    data = rows[lo:lo + page_size]
+    return {
+        "data": data,
+        "pagination": {
+            "total": len(rows),
+            "lastPage": last_page,
+            "prevPage": page - 1 if page > 1 else None,
+            "nextPage": page + 1 if page < last_page else None,
+            "perPage": page_size,
+            "currentPage": page,
+            "from": lo + 1,
+            "to": lo + len(data),
+        },
+    }
@@ -0,0 +1,176 @@
+"""Local HTTP server that answers like the Statnett and Fingrid APIs.
+
+Serves the fixture payloads on ``127.0.0.1``; responses are serialised once
+per distinct query so repeated runs measure the client, not the stub.
+Point the sources at it with ``FREQUENCY_STATNETT_URL`` and
+``FREQUENCY_FINGRID_URL`` (``StubServer.env()``).
+
+The fixtures end at ``benchmarks.fixtures.END``. With ``live=True`` the
+stub instead serves any day up to the current time, with the Fingrid rows
+as 3 min means of the same 1 s series, so the dashboard (whose windows end
+now) shows data. Run it on its own to try the app offline::
+
+    python -m benchmarks.stub_server 8765 --live
+"""
+import argparse
+import bisect
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.fixtures import (
+    DAY_SAMPLES,
+    DAYS,
+    FINGRID_MAX_PAGE_SIZE,
+    FINGRID_PAGE_SIZE,
+    FINGRID_STEP,
+    bysecond_payload,
+    fingrid_payload,
+    fingrid_rows,
+)
+
+STATNETT_PATH = "/restapi/Frequency/BySecond"
+FINGRID_PATH = "/api/datasets/177/data"
+
+
+def _naive_utc(text):
+    t = pd.Timestamp(text)
+    return t.tz_convert(None) if t.tzinfo is not None else t
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = self.server.respond(self.path)
+        if body is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port=0, live=False):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.live = live
+        self.requests = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._responses = {}
+        self._days = {day: json.dumps(bysecond_payload(day, seed=i)).encode() for i, day in enumerate(DAYS)}
+        self._rows = fingrid_rows()
+        self._row_ts = list(pd.to_datetime([r["startTime"] for r in self._rows], utc=True).tz_localize(None))
+        self._day_values = {}  # live mode: day -> 1 s values (NaN where missing)
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def env(self):
+        return {
+            "FREQUENCY_STATNETT_URL": self.base_url + STATNETT_PATH,
+            "FREQUENCY_FINGRID_URL": self.base_url + FINGRID_PATH,
+        }
+
+    def respond(self, path):
+        with self._lock:
+            body = self._responses.get(path)
+            if body is None:
+                body = self._build_live(path) if self.live else self._build(path)
+                if body is not None and not self.live:
+                    self._responses[path] = body
+            if body is not None:
+                self.requests += 1
+                self.bytes_sent += len(body)
+            return body
+
+    def _build(self, path):
+        parts = urlsplit(path)
+        query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        if parts.path == STATNETT_PATH:
+            day = query.get("From", "")[:10]
+            return self._days.get(day, json.dumps({"StartPointUTC": pd.Timestamp(day).value // 1_000_000, "PeriodTickMs": 1000, "Measurements": []}).encode())
+        if parts.path == FINGRID_PATH:
+            lo = _naive_utc(query["startTime"]) if "startTime" in query else self._row_ts[0]
+            hi = _naive_utc(query["endTime"]) if "endTime" in query else self._row_ts[-1]
+            rows = self._rows[bisect.bisect_left(self._row_ts, lo):bisect.bisect_right(self._row_ts, hi)]
+            page_size = min(int(query.get("pageSize", FINGRID_PAGE_SIZE)), FINGRID_MAX_PAGE_SIZE)
+            return json.dumps(fingrid_payload(rows, int(query.get("page", 1)), page_size)).encode()
+        return None
+
+    def _live_day(self, day):
+        """1 s values of the midnight ``day`` (NaN where missing), the same on every request."""
+        values = self._day_values.get(day)
+        if values is None:
+            seed = day.value // (DAY_SAMPLES * 1_000_000_000)
+            measurements = bysecond_payload(day, seed=seed)["Measurements"]
+            values = self._day_values[day] = np.array([np.nan if v is None else v for v in measurements])
+        return values
+
+    def _build_live(self, path):
+        # Nothing is cached: the newest samples change with the clock
+        parts = urlsplit(path)
+        query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        now = pd.Timestamp.now("UTC").tz_localize(None)
+        if parts.path == STATNETT_PATH:
+            day = pd.Timestamp(query.get("From", "")[:10])
+            elapsed = max(0, min(int((now - day).total_seconds()), DAY_SAMPLES))
+            values = self._live_day(day)[:elapsed]
+            start_ms = day.value // 1_000_000
+            return json.dumps({
+                "StartPointUTC": start_ms,
+                "EndPointUTC": start_ms + elapsed * 1000,
+                "PeriodTickMs": 1000,
+                "Measurements": [None if np.isnan(v) else float(v) for v in values],
+            }).encode()
+        if parts.path == FINGRID_PATH:
+            hi = min(_naive_utc(query["endTime"]) if "endTime" in query else now, now - FINGRID_STEP)
+            lo = _naive_utc(query["startTime"]) if "startTime" in query else hi - pd.Timedelta(days=1)
+            rows = []
+            for t in pd.date_range(lo.ceil(FINGRID_STEP), hi, freq=FINGRID_STEP):
+                day = t.normalize()
+                i = int((t - day).total_seconds())
+                value = np.nanmean(self._live_day(day)[i:i + int(FINGRID_STEP.total_seconds())])
+                rows.append({
+                    "datasetId": 177,
+                    "startTime": t.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+                    "endTime": (t + FINGRID_STEP).strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+                    "value": round(float(value), 2),
+                })
+            page_size = min(int(query.get("pageSize", FINGRID_PAGE_SIZE)), FINGRID_MAX_PAGE_SIZE)
+            return json.dumps(fingrid_payload(rows, int(query.get("page", 1)), page_size)).encode()
+        return None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="stub-api", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the Statnett and Fingrid fixtures locally.")
+    parser.add_argument("port", nargs="?", type=int, default=8765)
+    parser.add_argument("--live", action="store_true", help="serve data up to the current time instead of the fixture days")
+    args = parser.parse_args()
+    server = StubServer(args.port, live=args.live)
+    for name, value in server.env().items():
+        print(f"{name}={value}")
+    server.serve_forever()
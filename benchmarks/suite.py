@@ -0,0 +1,185 @@
+"""Offline benchmark of the dashboard pipeline against a local stub API.
+
+For every chart interval it measures the stages behind one page view:
+
+- ``fetch_nordic``: Statnett day download and parse for the window
+- ``fetch_finnish``: Fingrid dataset 177 download and parse for the window
+- ``update_data``: loaders into fresh buffers from a warm store, pyramid
+  update and aligning the window with a fresh ``Aligner`` (a cold start)
+- ``align_refresh``: the app's steady state, an ``Aligner`` holding the
+  window up to one Fingrid period ago brought up to the end
+- ``figure``: pyramid detail, ``build_figure`` and the JSON the browser gets
+- ``summary``: the summary panel statistics
+
+plus ``fetch_finnish`` for larger Fingrid responses. Each stage reports its
+best wall time and its peak traced memory (a separate, traced run), and is
+compared with ``benchmarks/baseline.json``. Run from the repository root::
+
+    python -m benchmarks.suite                 # compare with the baseline
+    python -m benchmarks.suite --save          # record a new baseline
+    python -m benchmarks.suite --check 1.5     # exit 1 on a >1.5x slowdown
+
+Baselines are machine specific; record one on the machine you compare on.
+"""
+import argparse
+import copy
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks.fixtures import END, FINGRID_SIZES, FINGRID_STEP
+from benchmarks.stub_server import StubServer
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+COLORS = {"nordic": "#42a5f5", "finland": "#ff5252", "plot_bg": "#ffffff", "paper": "#ffffff"}
+
+
+def measure(fn, repeat):
+    """``(best seconds, peak KiB, result)`` of ``fn()``."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak / 1024, result
+
+
+def run(repeat):
+    # Imported after the stub URLs are in the environment
+    import plotly.io as pio
+
+    from frequency.align import FINGRID_PERIOD_NS, Aligner
+    from frequency.buffer import GridBuffer, RollingBuffer
+    from frequency.fetch import set_rate_limit
+    from frequency.decimate import CHART_POINTS
+    from frequency.pyramid import Pyramid, detail_frame
+    from frequency.sources import fetch_finnish_range, fetch_nordic_range, load_finnish, load_nordic
+    from frequency.render import build_figure
+    from frequency.service import INTERVAL_MINUTES
+    from frequency.stats import describe
+    from frequency.store import FrequencyStore
+    from frequency.transform import minute_range_ns
+
+    # The stub has no rate limit to respect
+    set_rate_limit(os.environ["FREQUENCY_FINGRID_URL"], None)
+    results = {}
+    with tempfile.TemporaryDirectory() as root:
+        store = FrequencyStore(root)
+        for label, minutes in INTERVAL_MINUTES.items():
+            start, end = END - pd.Timedelta(minutes=minutes), END
+            lo, hi = start.value, end.value
+            results[f"fetch_nordic[{label}]"] = measure(lambda: fetch_nordic_range(lo, hi), repeat)
+            results[f"fetch_finnish[{label}]"] = measure(lambda: fetch_finnish_range(lo, hi, "stub"), repeat)
+
+            # Fill the store once so update_data measures the steady state
+            load_nordic(GridBuffer("1D"), start, end, store)
+            load_finnish(RollingBuffer("1D"), start, end, "stub", store)
+
+            def read_nordic(lo_ns, hi_ns):
+                return store.read("nordic", lo_ns, hi_ns)
+
+            def update_data():
+                pyramid = Pyramid("2D")
+                load_nordic(GridBuffer("1D"), start, end, store, pyramid)
+                df_finnish = load_finnish(RollingBuffer("1D"), start, end, "stub", store)
+                fin_ts, fin_values = df_finnish["Timestamp"].to_numpy().view("int64"), df_finnish["FrequencyHz"].to_numpy()
+                # What the app does: the aligner reads the Nordic samples from the store
+                merged = Aligner("nearest").update(fin_ts, fin_values, read_nordic, lo, hi)
+                return pyramid, merged, fin_ts, fin_values
+
+            results[f"update_data[{label}]"] = measure(update_data, repeat)
+            pyramid, merged, fin_ts, fin_values = results[f"update_data[{label}]"][2]
+
+            warm = Aligner("nearest")
+            warm.update(fin_ts, fin_values, read_nordic, lo - FINGRID_PERIOD_NS, hi - FINGRID_PERIOD_NS)
+
+            def align_refresh():
+                # Arrays are replaced, not modified, by update: a shallow copy is a fresh warm aligner
+                return copy.copy(warm).update(fin_ts, fin_values, read_nordic, lo, hi)
+
+            results[f"align_refresh[{label}]"] = measure(align_refresh, repeat)
+
+            def figure():
+                detail = detail_frame(pyramid, store, "nordic", *minute_range_ns(start, end), CHART_POINTS)
+                fig = build_figure(merged, "Suomi", COLORS, detail=detail)
+                return pio.to_json(fig.to_dict())
+
+            results[f"figure[{label}]"] = measure(figure, repeat)
+
+            def summary():
+                return (
+                    pyramid.summary(*minute_range_ns(start, end)),
+                    describe(merged["FrequencyHz_Suomi"].to_numpy(), period_s=180),
+                )
+
+            results[f"summary[{label}]"] = measure(summary, repeat)
+
+        for rows in FINGRID_SIZES:
+            lo = (END.floor("3min") - (rows - 1) * FINGRID_STEP).value
+            results[f"fetch_finnish[{rows} rows]"] = measure(lambda: fetch_finnish_range(lo, END.value, "stub"), repeat)
+    return {name: {"ms": round(s * 1000, 3), "peak_kib": round(kib, 1)} for name, (s, kib, _) in results.items()}
+
+
+def report(results, baseline, tolerance):
+    regressions = []
+    print(f"{'stage':<30}{'ms':>10}{'base':>10}{'ratio':>8}{'peak KiB':>12}{'base':>12}")
+    for name, r in results.items():
+        base = baseline.get(name)
+        ratio = r["ms"] / base["ms"] if base and base["ms"] else None
+        flag = ""
+        if ratio is not None and ratio > tolerance:
+            regressions.append(name)
+            flag = "  <-- slower"
+        print(
+            f"{name:<30}{r['ms']:>10.2f}{base['ms'] if base else float('nan'):>10.2f}"
+            f"{ratio if ratio is not None else float('nan'):>8.2f}{r['peak_kib']:>12.0f}"
+            f"{base['peak_kib'] if base else float('nan'):>12.0f}{flag}"
+        )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--check", type=float, metavar="RATIO", help="exit 1 if a stage is this much slower than the baseline")
+    parser.add_argument("--baseline", default=BASELINE)
+    args = parser.parse_args(argv)
+
+    server = StubServer().start()
+    os.environ.update(server.env())
+    try:
+        results = run(args.repeat)
+    finally:
+        server.stop()
+    print(f"stub: {server.requests} requests, {server.bytes_sent / 1e6:.1f} MB")
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    regressions = report(results, baseline, args.check or float("inf"))
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+        print(f"baseline written to {args.baseline}")
+    if regressions:
+        print(f"{len(regressions)} stage(s) slower than {args.check}x the baseline")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
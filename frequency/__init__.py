@@ -0,0 +1 @@
+"""Shared data handling for the frequency dashboards."""
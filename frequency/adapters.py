@@ -0,0 +1,90 @@
+"""Source adapters and their registry.
+
+A ``SourceAdapter`` describes one upstream frequency series: the requests
+that cover a time range (URL, query and auth headers), how a response
+becomes ``(ts_ns, values)`` columns, how often the series is published and
+polled, and the frame the dashboard shows for a window. The loaders,
+background ingestion and backfill only go through adapters, so another
+series (another Fingrid dataset, another TSO's feed) is a subclass and a
+``register`` call.
+"""
+import threading
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from frequency.fetch import get_many
+
+# ``params`` and ``headers`` are dicts or None
+Request = namedtuple("Request", ["url", "params", "headers"])
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+class SourceAdapter:
+    # Store, snapshot and cache name of the series
+    name = None
+    # Seconds between published samples (the upstream's update cadence)
+    cadence_s = 60
+    # Seconds between live polls
+    poll_s = 60
+    # Spacing of an evenly spaced series such as ``"1s"``, None for irregular points
+    period = None
+    # Days of history one backfill request covers
+    backfill_days = 1
+
+    def requests(self, lo_ns, hi_ns):
+        """``Request``s whose responses together cover ``lo_ns <= ts <= hi_ns``."""
+        raise NotImplementedError
+
+    def parse(self, payload, lo_ns):
+        """``(ts_ns, values)`` of one response, sorted, from ``lo_ns`` on."""
+        raise NotImplementedError
+
+    def fetch_range(self, lo_ns, hi_ns):
+        """Samples with ``lo_ns <= ts <= hi_ns`` as ``(ts_ns, values)``; the requests run concurrently."""
+        parts_ts, parts_values = [], []
+        for payload in get_many(self.requests(lo_ns, hi_ns)):
+            ts, values = self.parse(payload, lo_ns)
+            keep = ts <= hi_ns
+            parts_ts.append(ts[keep])
+            parts_values.append(values[keep])
+        if not parts_ts:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        return np.concatenate(parts_ts), np.concatenate(parts_values)
+
+    def window(self, start, end):
+        """``[lo_ns, hi_ns)`` of the samples shown for ``start``..``end`` (naive UTC)."""
+        return pd.Timestamp(start).value, pd.Timestamp(end).value + 1
+
+    def frame(self, ts_ns, values):
+        """Frame shown for the samples of a window."""
+        return pd.DataFrame({"Timestamp": ts_ns.view("datetime64[ns]"), "FrequencyHz": values})
+
+
+def register(adapter):
+    """Add ``adapter`` (replacing one of the same name); returns it."""
+    with _registry_lock:
+        _registry[adapter.name] = adapter
+    return adapter
+
+
+def unregister(name):
+    with _registry_lock:
+        _registry.pop(name, None)
+
+
+def get(name):
+    with _registry_lock:
+        try:
+            return _registry[name]
+        except KeyError:
+            raise KeyError(f"No source adapter named {name!r}: registered are {', '.join(_registry)}") from None
+
+
+def registered():
+    """Registered adapters in registration order."""
+    with _registry_lock:
+        return list(_registry.values())
@@ -0,0 +1,179 @@
+"""Incremental alignment of the Finnish points with the Nordic 1 s samples.
+
+Both sources are appended in time order (the buffers and the store only
+ever add newer samples), so alignment works on sorted ``int64`` timestamps
+with ``searchsorted`` and cumulative sums instead of sorting and merging
+whole frames. Modes:
+
+- ``nearest``: each Fingrid point with the Nordic minute mean nearest to it
+  (what ``merge_frames`` gives)
+- ``interval``: each Fingrid point with the Nordic mean over its 3 min
+  period ``[t, t + 3 min)``
+- ``grid``: both series on a common 1 min grid, the Nordic minute mean and
+  the latest Fingrid point at or before each minute
+
+An ``Aligner`` keeps the rows it has aligned and only aligns rows after the
+last final one on the next update, so a refresh costs the same however long
+the window is.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from frequency.metrics import span
+from frequency.series import BASE_HZ
+from frequency.transform import MINUTE_NS, bucket_means_ts
+
+MODES = ("nearest", "interval", "grid")
+S_NS = 1_000_000_000
+# Fingrid dataset 177 point spacing
+FINGRID_PERIOD_NS = 3 * MINUTE_NS
+
+
+def nearest(targets, ts_ns, values):
+    """Value of the sample nearest to each target (ties go to the earlier one)."""
+    if not len(ts_ns):
+        return np.full(len(targets), np.nan)
+    right = np.clip(np.searchsorted(ts_ns, targets), 1, len(ts_ns) - 1) if len(ts_ns) > 1 else np.zeros(len(targets), dtype=np.int64)
+    left = np.maximum(right - 1, 0)
+    pick = np.where(targets - ts_ns[left] <= ts_ns[right] - targets, left, right)
+    return values[pick]
+
+
+def asof(targets, ts_ns, values, tolerance_ns):
+    """Value of the latest sample at or before each target, NaN if older than ``tolerance_ns``."""
+    idx = np.searchsorted(ts_ns, targets, side="right") - 1
+    found = idx >= 0
+    idx = np.maximum(idx, 0)
+    if len(ts_ns):
+        found &= targets - ts_ns[idx] < tolerance_ns
+    return np.where(found, values[idx] if len(ts_ns) else np.nan, np.nan)
+
+
+def interval_means(lo_ns, hi_ns, ts_ns, values):
+    """Mean of the non-NaN samples with ``lo <= ts < hi`` for each interval (NaN if none)."""
+    valid = ~np.isnan(values)
+    # Offsets from 50 Hz keep the running sums small
+    sums = np.concatenate([[0.0], np.cumsum(np.where(valid, values - BASE_HZ, 0.0))])
+    counts = np.concatenate([[0], np.cumsum(valid)])
+    i = np.searchsorted(ts_ns, lo_ns)
+    j = np.searchsorted(ts_ns, hi_ns)
+    n = counts[j] - counts[i]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(n > 0, BASE_HZ + (sums[j] - sums[i]) / np.maximum(n, 1), np.nan)
+
+
+def _nearest_minutes(targets, ts_ns, values):
+    if not len(ts_ns):
+        return np.full(len(targets), np.nan)
+    origin, means = bucket_means_ts(ts_ns, values)
+    return nearest(targets, origin + np.arange(len(means), dtype=np.int64) * MINUTE_NS, means)
+
+
+class Aligner:
+    """Aligned rows for a window that only moves forward.
+
+    ``update`` is given the Finnish points of the window and a
+    ``read(start_ns, stop_ns) -> (ts_ns, values)`` of the Nordic 1 s samples,
+    such as ``FrequencyStore.read`` for ``"nordic"``. Rows whose Nordic
+    interval is complete are final and kept; the rest are redone next time.
+    """
+
+    def __init__(self, mode="nearest", period_ns=S_NS):
+        if mode not in MODES:
+            raise ValueError(f"Unknown alignment mode {mode!r}: use one of {', '.join(MODES)}")
+        self.mode = mode
+        self.period_ns = period_ns
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.ts = np.empty(0, dtype=np.int64)
+        self.finnish = np.empty(0)
+        self.nordic = np.empty(0)
+        self.final = 0
+        self.start_ns = np.iinfo(np.int64).min
+
+    def __len__(self):
+        return len(self.ts)
+
+    def update(self, fin_ts, fin_values, read, start_ns, stop_ns):
+        """Align up to ``stop_ns`` and return the rows from ``start_ns`` on as a frame."""
+        with self.lock, span("align"):
+            if start_ns < self.start_ns:
+                # The window was widened: the kept rows no longer start it
+                self.clear()
+            self.start_ns = start_ns
+            drop = int(np.searchsorted(self.ts[:self.final], start_ns))
+            since = int(self.ts[self.final - 1]) + 1 if self.final else start_ns
+            since = max(since, start_ns)
+            ts, finnish, nordic, final = self._align(fin_ts, fin_values, read, since, stop_ns)
+            keep = slice(drop, self.final)
+            self.ts = np.concatenate([self.ts[keep], ts])
+            self.finnish = np.concatenate([self.finnish[keep], finnish])
+            self.nordic = np.concatenate([self.nordic[keep], nordic])
+            self.final = self.final - drop + final
+            return self.frame()
+
+    def frame(self):
+        return pd.DataFrame({
+            "Timestamp": self.ts.view("datetime64[ns]"),
+            "FrequencyHz_Suomi": self.finnish,
+            "FrequencyHz_Nordic": self.nordic,
+        })
+
+    def _align(self, fin_ts, fin_values, read, since, stop_ns):
+        """Rows from ``since`` on and how many of them (leading) are final."""
+        if self.mode == "grid":
+            lo = -(-since // MINUTE_NS) * MINUTE_NS
+            ts, values = read(lo, stop_ns + 1)
+            # No empty minutes after the newest sample of either source
+            stop_ns = min(stop_ns, max(_last(ts), _last(fin_ts)))
+            targets = np.arange(lo, stop_ns // MINUTE_NS * MINUTE_NS + 1, MINUTE_NS, dtype=np.int64)
+            nordic = interval_means(targets, targets + MINUTE_NS, ts, values)
+            finnish = asof(targets, fin_ts, fin_values, FINGRID_PERIOD_NS)
+            # A minute is final once both sources have reached past it
+            done = targets + MINUTE_NS
+            final = (done <= _last(ts) + self.period_ns) & (targets <= _last(fin_ts))
+            return targets, finnish, nordic, _leading(final)
+        first = int(np.searchsorted(fin_ts, since))
+        targets, finnish = fin_ts[first:], fin_values[first:]
+        if not len(targets):
+            return targets, finnish, np.empty(0), 0
+        if self.mode == "interval":
+            ts, values = read(int(targets[0]), int(targets[-1]) + FINGRID_PERIOD_NS)
+            nordic = interval_means(targets, targets + FINGRID_PERIOD_NS, ts, values)
+            done = targets + FINGRID_PERIOD_NS
+        else:
+            half = MINUTE_NS // 2
+            lo = (int(targets[0]) - half) // MINUTE_NS * MINUTE_NS
+            ts, values = read(lo, (int(targets[-1]) + half) // MINUTE_NS * MINUTE_NS + MINUTE_NS)
+            nordic = _nearest_minutes(targets, ts, values)
+            # Later minutes can no longer be nearer once the nearest one is complete
+            done = (targets + half) // MINUTE_NS * MINUTE_NS + MINUTE_NS
+        return targets, finnish, nordic, _leading(done <= _last(ts) + self.period_ns)
+
+
+def _last(ts_ns):
+    return int(ts_ns[-1]) if len(ts_ns) else np.iinfo(np.int64).min // 2
+
+
+def _leading(flags):
+    """Number of leading ``True`` values."""
+    return int(np.argmin(flags)) if not flags.all() else len(flags)
+
+
+def align(mode, fin_ts, fin_values, nordic_ts, nordic_values, start_ns=None, stop_ns=None):
+    """One-off alignment of sorted Finnish points with sorted Nordic 1 s samples."""
+    def read(lo, hi):
+        i, j = np.searchsorted(nordic_ts, [lo, hi])
+        return nordic_ts[i:j], nordic_values[i:j]
+
+    starts = [int(a[0]) for a in (fin_ts, nordic_ts) if len(a)]
+    stops = [int(a[-1]) for a in (fin_ts, nordic_ts) if len(a)]
+    if not starts:
+        return Aligner(mode).frame()
+    start_ns = min(starts) if start_ns is None else start_ns
+    stop_ns = max(stops) if stop_ns is None else stop_ns
+    return Aligner(mode).update(fin_ts, fin_values, read, start_ns, stop_ns)
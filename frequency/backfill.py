@@ -0,0 +1,133 @@
+"""Parallel backfill of the local store with history for a date range.
+
+Each registered source adapter's history is split into chunks of its
+``backfill_days`` (one Statnett ``BySecond`` request per day, one
+paginated Fingrid fetch per 30 days), spread over a bounded worker pool
+with per-host rate limits, and each finished range is written straight to
+the ``FrequencyStore``::
+
+    python -m frequency.backfill 2023-01-01 2023-12-31
+    python -m frequency.backfill 2023-01-01 2023-12-31 --workers 8 --sources nordic
+
+The store's coverage list is the checkpoint: ranges already fetched are
+skipped, and a range whose request failed is not marked covered, so
+running the same command again fetches only what is still missing. The
+range is inclusive of whole days given as dates (UTC) and ends no later
+than now. Run it while the dashboard is stopped, or against another
+``--store``: the store is only safe to share between threads of one
+process.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+from frequency.adapters import get, register
+from frequency.fetch import set_rate_limit, set_request_workers
+from frequency.sources import STATNETT_URL, FingridDataset
+from frequency.store import DAY_NS, FrequencyStore
+
+WORKERS = 4
+STATNETT_PER_S = 2.0
+SOURCES = ("nordic", "finnish")
+# Data older than this is taken to be complete upstream
+SETTLED_NS = 3600 * 1_000_000_000
+
+
+def plan(store, start_ns, stop_ns, sources=SOURCES):
+    """``(source, lo_ns, hi_ns)`` ranges (``hi`` inclusive) in ``[start_ns, stop_ns)`` the store lacks.
+
+    One range per chunk of a source's ``backfill_days``, from its first
+    missing sample to its last: Statnett only serves whole days anyway.
+    """
+    tasks = []
+    for source in sources:
+        step = get(source).backfill_days * DAY_NS
+        chunk = start_ns - start_ns % DAY_NS
+        while chunk < stop_ns:
+            lo, hi = max(chunk, start_ns), min(chunk + step, stop_ns) - 1
+            gaps = store.missing(source, lo, hi)
+            if gaps:
+                tasks.append((source, gaps[0][0], gaps[-1][1]))
+            chunk += step
+    return tasks
+
+
+def run_task(store, task, now_ns):
+    """Fetch one range and write it to the store; returns the number of samples."""
+    source, lo, hi = task
+    ts, values = get(source).fetch_range(lo, hi)
+    if hi < now_ns - SETTLED_NS:
+        store.write(source, ts, values, covered=(lo, hi))
+    elif len(ts):
+        # Recent data may still be published: only mark up to the newest sample
+        store.write(source, ts, values, covered=(lo, int(ts[-1])))
+    return len(ts)
+
+
+def backfill(start, end, api_key=None, store=None, sources=SOURCES, workers=WORKERS, progress=None):
+    """Fill ``store`` for ``start``..``end`` (naive UTC); returns ``(done, failed)`` task lists.
+
+    ``failed`` pairs each task with its exception; nothing is marked covered
+    for it, so the next run retries it.
+    """
+    store = store or FrequencyStore()
+    now_ns = pd.Timestamp.now("UTC").tz_localize(None).value
+    start_ns, stop_ns = pd.Timestamp(start).value, min(pd.Timestamp(end).value, now_ns)
+    if api_key:
+        register(FingridDataset(api_key=api_key))
+    # Fingrid is always rate limited (see frequency.sources)
+    set_rate_limit(STATNETT_URL, STATNETT_PER_S, burst=workers)
+    # Each task's requests run on fetch's request pool: size it so all workers can have one in flight
+    set_request_workers(workers)
+    tasks = plan(store, start_ns, stop_ns, sources)
+    done, failed = [], []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="frequency-backfill") as pool:
+        futures = {pool.submit(run_task, store, task, now_ns): task for task in tasks}
+        for future in as_completed(futures):
+            task = futures[future]
+            try:
+                n = future.result()
+            except Exception as e:
+                failed.append((task, e))
+                n = e
+            else:
+                done.append(task)
+            if progress is not None:
+                progress(task, n)
+    return done, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backfill the local frequency store for a date range.")
+    parser.add_argument("start", help="first day (YYYY-MM-DD, UTC)")
+    parser.add_argument("end", help="last day, inclusive (YYYY-MM-DD, UTC)")
+    parser.add_argument("--sources", nargs="+", choices=SOURCES, default=list(SOURCES))
+    parser.add_argument("--workers", type=int, default=WORKERS, help=f"concurrent ranges and requests (default: {WORKERS})")
+    parser.add_argument("--store", help="store directory (default: $FREQUENCY_STORE_DIR or .data)")
+    parser.add_argument("--api-key", default=os.environ.get("FINGRID_API_KEY"), help="Fingrid API key (default: $FINGRID_API_KEY)")
+    args = parser.parse_args(argv)
+    if "finnish" in args.sources and not args.api_key:
+        parser.error("a Fingrid API key is required for finnish (--api-key or FINGRID_API_KEY)")
+    start = pd.Timestamp(args.start).normalize()
+    end = pd.Timestamp(args.end).normalize() + pd.Timedelta(days=1)
+
+    def progress(task, n):
+        source, lo, hi = task
+        what = f"failed: {n}" if isinstance(n, Exception) else f"{n} samples"
+        print(f"{source} {pd.Timestamp(lo):%Y-%m-%d %H:%M}..{pd.Timestamp(hi):%Y-%m-%d %H:%M}: {what}", file=sys.stderr)
+
+    t0 = time.perf_counter()
+    done, failed = backfill(start, end, args.api_key, FrequencyStore(args.store), args.sources, args.workers, progress)
+    print(f"{len(done)} ranges fetched, {len(failed)} failed in {time.perf_counter() - t0:.1f} s", file=sys.stderr)
+    if failed:
+        print("run the same command again to retry the failed ranges", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""Rolling in-memory sample buffers for incremental fetching.
+
+Each source keeps one buffer. A refresh only asks upstream for data newer
+than ``last`` and appends it; samples older than ``keep`` behind the newest
+one are dropped. ``RollingBuffer`` stores explicit ``int64`` ns timestamps
+and float values (any spacing); ``GridBuffer`` stores an evenly spaced
+source such as Statnett's 1 s data as a ``CompactSeries`` (2 bytes per
+sample). Both have the same interface.
+"""
+import threading
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from frequency.series import CompactSeries
+
+
+class RollingBuffer:
+    def __init__(self, keep):
+        self.keep_ns = pd.Timedelta(keep).value
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.ts = np.empty(0, dtype=np.int64)
+        self.values = np.empty(0)
+        # Earliest time the buffer is known to be complete from
+        self.covered_from = None
+
+    def __len__(self):
+        return len(self.ts)
+
+    @property
+    def first(self):
+        return int(self.ts[0]) if len(self.ts) else None
+
+    @property
+    def last(self):
+        return int(self.ts[-1]) if len(self.ts) else None
+
+    def resume_from(self, start):
+        """ns timestamp from which data has to be fetched so ``start``..now is covered.
+
+        If the buffer does not reach back to ``start`` (first use, or a wider
+        window than before) it is cleared and refilled from ``start``.
+        """
+        start_ns = pd.Timestamp(start).value
+        if self.covered_from is None or self.covered_from > start_ns or not len(self.ts):
+            self.clear()
+            self.covered_from = start_ns
+            return start_ns
+        return self.last + 1
+
+    def append(self, ts_ns, values):
+        """Append samples newer than ``last``; returns the number added."""
+        ts_ns = np.asarray(ts_ns, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        if len(ts_ns) and np.any(np.diff(ts_ns) < 0):
+            order = np.argsort(ts_ns, kind="stable")
+            ts_ns, values = ts_ns[order], values[order]
+        if self.last is not None:
+            new = ts_ns > self.last
+            ts_ns, values = ts_ns[new], values[new]
+        if not len(ts_ns):
+            return 0
+        self.ts = np.concatenate([self.ts, ts_ns])
+        self.values = np.concatenate([self.values, values])
+        cutoff = self.last - self.keep_ns
+        if self.ts[0] < cutoff:
+            i = np.searchsorted(self.ts, cutoff)
+            self.ts, self.values = self.ts[i:], self.values[i:]
+        if self.covered_from is None or self.covered_from < cutoff:
+            self.covered_from = cutoff
+        return len(ts_ns)
+
+    def window(self, start_ns, stop_ns):
+        """Copies of the samples with ``start_ns <= ts < stop_ns``."""
+        lo, hi = np.searchsorted(self.ts, [start_ns, stop_ns])
+        return self.ts[lo:hi].copy(), self.values[lo:hi].copy()
+
+
+class GridBuffer:
+    def __init__(self, keep, period="1s"):
+        self.keep_ns = pd.Timedelta(keep).value
+        self.period_ns = pd.Timedelta(period).value
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.series = None
+        # Earliest time the buffer is known to be complete from
+        self.covered_from = None
+
+    def __len__(self):
+        return 0 if self.series is None else len(self.series)
+
+    @property
+    def nbytes(self):
+        return 0 if self.series is None else self.series.nbytes
+
+    @property
+    def first(self):
+        return self.series.start_ns if len(self) else None
+
+    @property
+    def last(self):
+        return self.series.stop_ns - self.period_ns if len(self) else None
+
+    def resume_from(self, start):
+        """ns timestamp from which data has to be fetched so ``start``..now is covered.
+
+        If the buffer does not reach back to ``start`` (first use, or a wider
+        window than before) it is cleared and refilled from ``start``.
+        """
+        start_ns = pd.Timestamp(start).value
+        if self.covered_from is None or self.covered_from > start_ns or not len(self):
+            self.clear()
+            self.covered_from = start_ns
+            return start_ns
+        return self.last + 1
+
+    def append(self, ts_ns, values):
+        """Append samples newer than ``last``; returns the number added."""
+        ts_ns = np.asarray(ts_ns, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        if len(ts_ns) and np.any(np.diff(ts_ns) < 0):
+            order = np.argsort(ts_ns, kind="stable")
+            ts_ns, values = ts_ns[order], values[order]
+        if self.last is not None:
+            new = ts_ns > self.last
+            ts_ns, values = ts_ns[new], values[new]
+        if not len(ts_ns):
+            return 0
+        if self.series is None or ts_ns[0] - self.last > self.keep_ns:
+            # Nothing kept would survive the gap: start a new series on the new samples
+            self.series = CompactSeries(ts_ns[0], self.period_ns)
+        self.series.put(ts_ns, values)
+        cutoff = self.last - self.keep_ns
+        self.series.drop_before(cutoff)
+        if self.covered_from is None or self.covered_from < cutoff:
+            self.covered_from = cutoff
+        return len(ts_ns)
+
+    def window(self, start_ns, stop_ns):
+        """Timestamps and values of the slots with ``start_ns <= ts < stop_ns`` (missing ones are NaN)."""
+        if self.series is None:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        return self.series.window(start_ns, stop_ns)
+
+
+def statnett_days(since_ns, end):
+    """UTC dates (``YYYY-MM-DD``) of the BySecond requests needed from ``since_ns`` to ``end``.
+
+    The API only accepts a date, so a refresh that crosses midnight UTC needs
+    the tail of the previous day and the start of the new one.
+    """
+    first = pd.Timestamp(since_ns).normalize()
+    last = pd.Timestamp(end).normalize()
+    days = []
+    while first <= last:
+        days.append(first.strftime("%Y-%m-%d"))
+        first += timedelta(days=1)
+    return days
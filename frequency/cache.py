@@ -0,0 +1,146 @@
+"""Process-wide cache for results derived from the ingest snapshots.
+
+One ``SharedCache`` instance is shared by every Streamlit session (see
+``st.cache_resource`` in the app scripts). Entries are keyed by kind and the
+versions they were built from: merged frames by interval, alignment mode,
+window end and snapshot versions, figures by data version and display
+options, spectral figures by the ``SpectralIndex`` version. Sessions seeing
+the same snapshots therefore share entries and a new snapshot simply makes
+new keys. Entries expire after a per-source TTL, the least recently used
+ones are dropped once the memory budget is exceeded, and concurrent misses
+for the same key run the loader only once.
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from frequency.metrics import CACHE_REQUESTS, registry
+
+# Publishing cadence per source in seconds; TTL of entries derived from it
+CADENCE_S = {
+    "nordic": 60,    # 1 s data, shown as 1 minute means
+    "finnish": 180,  # Fingrid dataset 177 is published every 3 minutes
+}
+
+
+def sizeof(value):
+    """Approximate bytes held by a cached value: frames, arrays, Plotly figures and tuples of them."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(sizeof(v) for v in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(v) for v in value.values())
+    if hasattr(value, "to_plotly_json"):
+        # A figure's trace arrays are not in its sys.getsizeof; count their serialized form
+        return sizeof(value.to_plotly_json())
+    return sys.getsizeof(value)
+
+
+def _is_empty(value):
+    return value is None or (isinstance(value, (pd.DataFrame, pd.Series)) and value.empty)
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SharedCache:
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._inflight = {}
+
+    def get(self, key):
+        with self._lock:
+            return self._lookup(key)
+
+    def get_or_load(self, key, loader, ttl):
+        """Return the cached value for ``key`` or run ``loader()`` once for all callers.
+
+        Empty results (failed fetches) are handed back but not stored.
+        """
+        with self._lock:
+            value = self._lookup(key)
+            if value is not None:
+                self._count(key, "hit")
+                return value
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+                self._count(key, "miss")
+            else:
+                self._count(key, "hit")
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        try:
+            flight.value = loader()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                if flight.error is None and not _is_empty(flight.value):
+                    self._store(key, flight.value, ttl)
+                del self._inflight[key]
+            flight.done.set()
+        return flight.value
+
+    def _count(self, key, result):
+        if result == "hit":
+            self.hits += 1
+        else:
+            self.misses += 1
+        # Keys start with their kind ("merged", "figure", a source name)
+        kind = key[0] if isinstance(key, tuple) and key else "other"
+        registry.inc(CACHE_REQUESTS, cache=kind, result=result)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry[2]
+
+    def _drop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _store(self, key, value, ttl):
+        if key in self._entries:
+            self._drop(key)
+        now = time.monotonic()
+        for k in [k for k, e in self._entries.items() if e[0] < now]:
+            self._drop(k)
+        size = sizeof(value)
+        self._entries[key] = (now + ttl, size, value)
+        self._bytes += size
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            self._drop(next(iter(self._entries)))
@@ -0,0 +1,64 @@
+"""Visual downsampling so chart payloads stay bounded.
+
+Both methods return indices into the input, so the same selection can be
+applied to every column of a series. ``n_out`` should be about the chart
+width in pixels; a plotted line cannot show more detail than that.
+"""
+import numpy as np
+
+# About twice the width of a full-width chart on a large screen
+CHART_POINTS = 2000
+
+
+def minmax_indices(y, n_out):
+    """Per-bucket min and max (``n_out // 2`` buckets); keeps every extreme visible."""
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n <= n_out:
+        return np.arange(n)
+    buckets = max(1, n_out // 2)
+    size = -(-n // buckets)
+    padded = np.full(buckets * size, np.nan)
+    padded[:n] = y
+    grid = padded.reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+    lo = offsets + np.argmin(np.where(np.isnan(grid), np.inf, grid), axis=1)
+    hi = offsets + np.argmax(np.where(np.isnan(grid), -np.inf, grid), axis=1)
+    idx = np.unique(np.concatenate([lo, hi]))
+    idx = idx[idx < n]
+    return idx[~np.isnan(y[idx])]
+
+
+def lttb_indices(x, y, n_out):
+    """Largest-Triangle-Three-Buckets selection of ``n_out`` points (keeps the shape)."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_hi = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[hi:next_hi].mean()
+        avg_y = np.nanmean(y[hi:next_hi]) if not np.isnan(y[hi:next_hi]).all() else y[a]
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + (int(np.nanargmax(area)) if not np.isnan(area).all() else 0)
+        out[i + 1] = a
+    return out
+
+
+def decimate(x, y, n_out=CHART_POINTS, method="minmax"):
+    """``(x, y)`` reduced to at most about ``n_out`` points; short series pass through."""
+    if len(y) <= n_out:
+        return x, y
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=np.float64)
+    if method == "lttb":
+        idx = lttb_indices(x.astype("int64") if x.dtype.kind == "M" else x, y, n_out)
+    else:
+        idx = minmax_indices(y, n_out)
+    return x[idx], y[idx]
@@ -0,0 +1,228 @@
+"""Frequency event detection over the 1 s Nordic samples.
+
+Kinds of event, each a run of consecutive flagged samples:
+
+- ``low``/``high``: frequency below 49.9 Hz or above 50.1 Hz
+- ``rocof``: rate of change over 2 s faster than 0.05 Hz/s either way
+- ``drop``: frequency 0.1 Hz or more below its maximum of the last 30 s
+
+Runs less than 10 s apart are one event, so noise around a threshold does
+not split it.
+
+An ``EventDetector`` is fed newly arrived samples, like the pyramid. It
+keeps only enough of the previous samples to evaluate the look-back
+windows and to finish runs that are still open, so each update scans the
+new samples only. Finished events go into an ``EventIndex``: columns sorted
+by start time, read by time range without touching the raw data.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+S_NS = 1_000_000_000
+EVENT_LOW = 49.9
+EVENT_HIGH = 50.1
+ROCOF_WINDOW_S = 2
+ROCOF_LIMIT = 0.05
+DROP_WINDOW_S = 30
+DROP_HZ = 0.1
+MERGE_GAP_S = 10
+KINDS = ("low", "high", "rocof", "drop")
+# Samples needed before a sample to evaluate it
+LOOKBACK = max(ROCOF_WINDOW_S, DROP_WINDOW_S)
+COLUMNS = ("kind", "start", "end", "extreme_ts", "extreme")
+
+
+def _empty():
+    return {
+        "kind": np.empty(0, dtype=np.int8),
+        "start": np.empty(0, dtype=np.int64),
+        "end": np.empty(0, dtype=np.int64),
+        "extreme_ts": np.empty(0, dtype=np.int64),
+        "extreme": np.empty(0),
+    }
+
+
+def _ffill(values):
+    # Single missing samples should not split an event
+    idx = np.where(np.isnan(values), 0, np.arange(len(values)))
+    np.maximum.accumulate(idx, out=idx)
+    return values[idx]
+
+
+def flags(values):
+    """Boolean flags per kind for evenly spaced 1 s ``values``.
+
+    The first ``LOOKBACK`` samples are not flagged for the windowed kinds.
+    """
+    v = _ffill(np.asarray(values, dtype=np.float64))
+    with np.errstate(invalid="ignore"):
+        out = {"low": v < EVENT_LOW, "high": v > EVENT_HIGH}
+        rocof = np.zeros(len(v), dtype=bool)
+        k = ROCOF_WINDOW_S
+        if len(v) > k:
+            rocof[k:] = np.abs(v[k:] - v[:-k]) / k > ROCOF_LIMIT
+        drop = np.zeros(len(v), dtype=bool)
+        if len(v) >= DROP_WINDOW_S:
+            windows = np.lib.stride_tricks.sliding_window_view(np.where(np.isnan(v), -np.inf, v), DROP_WINDOW_S)
+            drop[DROP_WINDOW_S - 1:] = v[DROP_WINDOW_S - 1:] <= windows.max(axis=1) - DROP_HZ
+    out["rocof"], out["drop"] = rocof, drop
+    return out
+
+
+def runs(flag, gap=MERGE_GAP_S):
+    """``(starts, stops)`` indices of the runs of ``True`` (``stops`` exclusive).
+
+    Runs separated by fewer than ``gap`` samples are joined.
+    """
+    edges = np.diff(np.concatenate([[False], flag, [False]]).astype(np.int8))
+    starts, stops = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    if not len(starts):
+        return starts, stops
+    apart = starts[1:] - stops[:-1] >= gap
+    return starts[np.concatenate([[True], apart])], stops[np.concatenate([apart, [True]])]
+
+
+class EventIndex:
+    """Events as columns sorted by start time (then kind)."""
+
+    def __init__(self, keep):
+        self.keep_ns = pd.Timedelta(keep).value
+        self.lock = threading.Lock()
+        self.columns = _empty()
+
+    def __len__(self):
+        return len(self.columns["start"])
+
+    def clear(self):
+        with self.lock:
+            self.columns = _empty()
+
+    def add(self, batch):
+        """Insert a batch of events (dict of columns) and drop those past ``keep``."""
+        if not len(batch["start"]):
+            return
+        with self.lock:
+            merged = {c: np.concatenate([self.columns[c], batch[c]]) for c in COLUMNS}
+            order = np.lexsort((merged["kind"], merged["start"]))
+            cutoff = int(merged["end"].max()) - self.keep_ns
+            order = order[merged["end"][order] >= cutoff]
+            self.columns = {c: merged[c][order] for c in COLUMNS}
+
+    def between(self, start_ns, stop_ns):
+        """Frame of the events overlapping ``[start_ns, stop_ns)``, oldest first."""
+        with self.lock:
+            c = self.columns
+            # Events start in time order, so only those starting before stop_ns can overlap
+            hi = int(np.searchsorted(c["start"], stop_ns))
+            keep = np.flatnonzero(c["end"][:hi] >= start_ns)
+            rows = {k: v[keep] for k, v in c.items()}
+        return pd.DataFrame({
+            "kind": np.asarray(KINDS)[rows["kind"]],
+            "start": rows["start"].view("datetime64[ns]"),
+            "end": rows["end"].view("datetime64[ns]"),
+            "duration_s": (rows["end"] - rows["start"]) / S_NS + 1,
+            "extreme_ts": rows["extreme_ts"].view("datetime64[ns]"),
+            "extreme": rows["extreme"],
+        })
+
+
+class EventDetector:
+    """Incremental detector for an evenly spaced 1 s sample stream."""
+
+    def __init__(self, keep, period_ns=S_NS):
+        self.period_ns = period_ns
+        self.index = EventIndex(keep)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.first = None
+        self.last = None
+        # Tail of the samples seen so far: look-back context and open runs
+        self.ts = np.empty(0, dtype=np.int64)
+        self.values = np.empty(0)
+        self.index.clear()
+
+    def update_from(self, buffer):
+        """Scan the samples ``buffer`` gained since the last call.
+
+        As with the pyramid, a buffer that now reaches further back than
+        what was scanned (it was refilled for a wider window) is rescanned.
+        """
+        if not len(buffer):
+            return
+        with self.lock:
+            if self.first is None or buffer.first < self.first:
+                self.reset()
+                self.first = buffer.first
+                ts, values = buffer.window(buffer.first, buffer.last + 1)
+            else:
+                ts, values = buffer.window(self.last + 1, np.iinfo(np.int64).max)
+            self.update(ts, values)
+            self.first = buffer.first
+
+    def update(self, ts_ns, values):
+        """Scan evenly spaced samples newer than the last ones seen."""
+        if not len(ts_ns):
+            return
+        if len(self.ts) and ts_ns[0] - self.ts[-1] != self.period_ns:
+            # A gap: the look-back context no longer applies and open runs end
+            self._scan(self.ts, self.values, final=True)
+            self.ts, self.values = self.ts[:0], self.values[:0]
+        ts = np.concatenate([self.ts, ts_ns])
+        values = np.concatenate([self.values, values])
+        keep_from = self._scan(ts, values, final=False)
+        self.ts, self.values = ts[keep_from:], values[keep_from:]
+        self.last = int(ts[-1])
+
+    def _scan(self, ts, values, final):
+        """Add the runs that have ended; returns the index the kept tail starts at."""
+        if not len(ts):
+            return 0
+        batch, keep_from = [], max(len(ts) - LOOKBACK, 0)
+        flagged = flags(values)
+        for kind, name in enumerate(KINDS):
+            starts, stops = runs(flagged[name])
+            # A run that may still go on, or be joined by the next one
+            is_open = len(starts) and stops[-1] > len(ts) - MERGE_GAP_S
+            if final:
+                # Only a run left open last time is still to be added
+                starts, stops = (starts[-1:], stops[-1:]) if is_open else (starts[:0], stops[:0])
+            else:
+                if is_open:
+                    # Still open: keep it and its look-back for the next scan
+                    keep_from = min(keep_from, max(int(starts[-1]) - LOOKBACK, 0))
+                    starts, stops = starts[:-1], stops[:-1]
+                if self.last is not None:
+                    # Runs that were closed at the last scan were added then
+                    new = ts[stops - 1] > self.last - MERGE_GAP_S * self.period_ns
+                    starts, stops = starts[new], stops[new]
+            if len(starts):
+                batch.append(self._events(kind, ts, values, starts, stops))
+        if batch:
+            self.index.add({c: np.concatenate([b[c] for b in batch]) for c in COLUMNS})
+        return keep_from
+
+    @staticmethod
+    def _events(kind, ts, values, starts, stops):
+        # Extreme sample of each run: the nadir, or the peak for high frequency
+        lengths = stops - starts
+        run_id = np.repeat(np.arange(len(starts)), lengths)
+        # Sample indices of all runs back to back
+        idx = np.arange(lengths.sum()) + np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        v = values[idx]
+        sign = -1.0 if KINDS[kind] == "high" else 1.0
+        key = np.where(np.isnan(v), np.inf, sign * v)
+        # Lexicographic sort: by run, then by value, so the first of each run is its extreme
+        order = np.lexsort((key, run_id))
+        first = np.concatenate([[0], np.flatnonzero(np.diff(run_id[order])) + 1])
+        pick = idx[order[first]]
+        return {
+            "kind": np.full(len(starts), kind, dtype=np.int8),
+            "start": ts[starts],
+            "end": ts[stops - 1],
+            "extreme_ts": ts[pick],
+            "extreme": values[pick],
+        }
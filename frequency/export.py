@@ -0,0 +1,134 @@
+"""Headless export of merged Nordic/Finnish frequency for a date range.
+
+Streams one Statnett day at a time through the same parse and alignment
+steps the dashboard uses, and appends each day to the output file, so
+memory use does not grow with the length of the range::
+
+    python -m frequency.export 2024-01-01 2024-01-31 january.parquet
+    python -m frequency.export 2024-01-01 2024-01-07 week.csv --api-key ...
+    python -m frequency.export 2024-01-01 2024-01-07 week.csv --align interval
+
+The range is inclusive of whole days given as dates; timestamps are naive
+UTC. The Fingrid API key is read from ``FINGRID_API_KEY`` unless given.
+Parquet output needs pyarrow.
+"""
+import argparse
+import os
+import sys
+
+import pandas as pd
+
+from frequency.align import MODES, align
+from frequency.sources import fetch_finnish_range, fetch_nordic_range
+
+COLUMNS = ["Timestamp", "FrequencyHz_Suomi", "FrequencyHz_Nordic"]
+
+
+def day_windows(start, end):
+    """``(lo, hi)`` naive UTC windows covering ``start``..``end`` split at midnight (``hi`` exclusive)."""
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    day = start.normalize()
+    while day < end:
+        next_day = day + pd.Timedelta(days=1)
+        yield max(start, day), min(end, next_day)
+        day = next_day
+
+
+def iter_days(start, end, api_key, mode="nearest"):
+    """Aligned frame per day of ``start``..``end`` (see ``frequency.align``); days without data from either source are skipped."""
+    for lo, hi in day_windows(start, end):
+        # Inclusive ends in the sources: stop just before the next window
+        last = hi.value - 1
+        nordic_ts, nordic_values = fetch_nordic_range(lo.value, last)
+        fin_ts, fin_values = fetch_finnish_range(lo.value, last, api_key)
+        if not len(nordic_ts) or not len(fin_ts):
+            yield lo, None
+            continue
+        yield lo, align(mode, fin_ts, fin_values, nordic_ts, nordic_values, lo.value, last)[COLUMNS]
+
+
+class _CsvWriter:
+    def __init__(self, path):
+        self.path = path
+        self.header = True
+
+    def write(self, frame):
+        frame.to_csv(self.path, mode="w" if self.header else "a", header=self.header, index=False)
+        self.header = False
+
+    def close(self):
+        if self.header:
+            pd.DataFrame(columns=COLUMNS).to_csv(self.path, index=False)
+
+
+class _ParquetWriter:
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet output needs pyarrow (pip install pyarrow); use a .csv path instead") from None
+        self._pa = pa
+        self.schema = pa.schema([("Timestamp", pa.timestamp("ns")), ("FrequencyHz_Suomi", pa.float64()), ("FrequencyHz_Nordic", pa.float64())])
+        # One row group per day
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, frame):
+        self.writer.write_table(self._pa.Table.from_pandas(frame, schema=self.schema, preserve_index=False))
+
+    def close(self):
+        self.writer.close()
+
+
+def writer_for(path, fmt=None):
+    fmt = fmt or os.path.splitext(path)[1].lstrip(".").lower()
+    if fmt == "csv":
+        return _CsvWriter(path)
+    if fmt == "parquet":
+        return _ParquetWriter(path)
+    raise ValueError(f"Unknown output format {fmt!r}: use csv or parquet")
+
+
+def export(start, end, path, api_key, fmt=None, progress=None, mode="nearest"):
+    """Write ``start``..``end`` to ``path``; returns the number of rows written."""
+    writer = writer_for(path, fmt)
+    rows = 0
+    try:
+        for day, frame in iter_days(start, end, api_key, mode):
+            if frame is not None and not frame.empty:
+                writer.write(frame)
+                rows += len(frame)
+            if progress is not None:
+                progress(day, 0 if frame is None else len(frame))
+    finally:
+        writer.close()
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export merged Nordic/Finnish frequency to CSV or Parquet.")
+    parser.add_argument("start", help="first day (YYYY-MM-DD, UTC)")
+    parser.add_argument("end", help="last day, inclusive (YYYY-MM-DD, UTC)")
+    parser.add_argument("output", help="output file (.csv or .parquet)")
+    parser.add_argument("--format", choices=["csv", "parquet"], help="override the format implied by the file name")
+    parser.add_argument("--align", choices=MODES, default="nearest", help="how Fingrid points are matched with Nordic samples (default: nearest minute mean)")
+    parser.add_argument("--api-key", default=os.environ.get("FINGRID_API_KEY"), help="Fingrid API key (default: $FINGRID_API_KEY)")
+    args = parser.parse_args(argv)
+    if not args.api_key:
+        parser.error("a Fingrid API key is required (--api-key or FINGRID_API_KEY)")
+    start = pd.Timestamp(args.start).normalize()
+    end = pd.Timestamp(args.end).normalize() + pd.Timedelta(days=1)
+
+    def progress(day, n):
+        print(f"{day:%Y-%m-%d}: {n} rows" if n else f"{day:%Y-%m-%d}: no data", file=sys.stderr)
+
+    try:
+        rows = export(start, end, args.output, args.api_key, args.format, progress, args.align)
+    except (RuntimeError, ValueError) as e:
+        parser.exit(1, f"{e}\n")
+    print(f"{rows} rows written to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,355 @@
+"""HTTP layer: pooled keep-alive sessions and concurrent source fetches.
+
+``get_json`` retries timeouts, connection errors, 429 and 5xx responses
+with jittered exponential backoff. After repeated failed calls a per-host
+circuit breaker stops calling the host for a cool-down period, then lets
+a single trial request probe it, so a struggling upstream is not hammered
+and callers fail fast. Responses that
+carry an ``ETag`` or ``Last-Modified`` header are revalidated with
+``If-None-Match``/``If-Modified-Since`` and a 304 reuses the cached body.
+Hosts given a rate limit with ``set_rate_limit`` are paced by a token
+bucket shared by all threads, retries included. Identical requests made
+while one is already in flight wait for its response instead of sending
+their own, so sources polled in the same tick share overlapping ranges.
+"""
+import random
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from frequency.metrics import (
+    UPSTREAM_BYTES,
+    UPSTREAM_DEDUPED,
+    UPSTREAM_ERRORS,
+    UPSTREAM_NOT_MODIFIED,
+    UPSTREAM_RETRIES,
+    UPSTREAM_SECONDS,
+    registry,
+    span,
+)
+
+TIMEOUT_S = 10
+RETRIES = 2
+BACKOFF_S = 0.5
+BACKOFF_MAX_S = 4.0
+RETRY_STATUS = {429, 500, 502, 503, 504}
+# Consecutive failed calls (retries exhausted) before a host's circuit opens, and its cool-down
+BREAKER_THRESHOLD = 3
+BREAKER_COOLDOWN_S = 30.0
+BREAKER_MAX_COOLDOWN_S = 300.0
+# Validated responses kept for conditional requests
+CONDITIONAL_ENTRIES = 16
+# Concurrent source loads, and concurrent requests of one source fetch
+FETCH_WORKERS = 8
+REQUEST_WORKERS = 4
+
+FetchResult = namedtuple("FetchResult", ["value", "error", "seconds"])
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="frequency-fetch")
+# Separate pool: requests are made from inside fetch_all tasks
+_request_workers = REQUEST_WORKERS
+_request_executor = ThreadPoolExecutor(max_workers=_request_workers, thread_name_prefix="frequency-request")
+_breakers = {}
+_validated = OrderedDict()  # url -> (etag, last_modified, payload)
+_validated_lock = threading.Lock()
+_limiters = {}
+_inflight = {}  # (url, params, headers) -> Future of the payload
+_inflight_lock = threading.Lock()
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised without a request while a host's circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Closed, open for a cool-down after ``threshold`` failed calls in a row, then half-open.
+
+    Half-open lets one trial call through and rejects the others until it
+    reports back: a success closes the breaker, a failure re-opens it with a
+    longer cool-down.
+    """
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown_s=BREAKER_COOLDOWN_S, max_cooldown_s=BREAKER_MAX_COOLDOWN_S):
+        self.threshold = threshold
+        self.cooldown_s = cooldown_s
+        self.max_cooldown_s = max_cooldown_s
+        self.failures = 0
+        self.opened = 0  # times opened in a row, for the growing cool-down
+        self.open_until = 0.0
+        self.trial = False  # the half-open trial call is in flight
+        self._lock = threading.Lock()
+
+    def check(self, host):
+        """Raise ``CircuitOpenError`` unless a call may go through; True for the half-open trial call."""
+        with self._lock:
+            if not self.open_until:
+                return False
+            remaining = self.open_until - time.monotonic()
+            if remaining > 0:
+                raise CircuitOpenError(f"{host} unavailable after repeated failures; next attempt in {remaining:.0f} s")
+            if self.trial:
+                raise CircuitOpenError(f"{host} unavailable after repeated failures; a trial request is in flight")
+            self.trial = True
+            return True
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened = 0
+            self.open_until = 0.0
+            self.trial = False
+
+    def failure(self, trial=False):
+        """Count a failed call; a failed trial call re-opens the breaker at once."""
+        with self._lock:
+            if trial and self.trial:
+                self._open()
+                return
+            self.failures += 1
+            if self.failures >= self.threshold and not self.open_until:
+                self._open()
+
+    def _open(self):
+        cooldown = min(self.cooldown_s * 2 ** self.opened, self.max_cooldown_s)
+        self.open_until = time.monotonic() + cooldown
+        self.opened += 1
+        self.failures = 0
+        self.trial = False
+
+
+class RateLimiter:
+    """Token bucket: ``per_s`` requests per second on average, bursts of up to ``burst``."""
+
+    def __init__(self, per_s, burst=1):
+        self.per_s = per_s
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token, sleeping until one is available."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.per_s)
+            self.updated = now
+            self.tokens -= 1
+            # A negative balance is this caller's place in the queue
+            wait = -self.tokens / self.per_s if self.tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+
+
+def set_rate_limit(url, per_s, burst=1):
+    """Limit requests to the host of ``url``; ``per_s=None`` removes the limit."""
+    host = urlsplit(url).netloc
+    with _sessions_lock:
+        if per_s is None:
+            _limiters.pop(host, None)
+        else:
+            _limiters[host] = RateLimiter(per_s, burst)
+
+
+def set_request_workers(n):
+    """Size the pool that runs the requests of source fetches (``REQUEST_WORKERS`` by default).
+
+    For batch jobs such as the backfill, whose own workers each wait on a
+    fetch; requests already queued finish on the old pool.
+    """
+    global _request_executor, _request_workers
+    with _sessions_lock:
+        old = _request_executor
+        _request_workers = n
+        _request_executor = ThreadPoolExecutor(max_workers=n, thread_name_prefix="frequency-request")
+    old.shutdown(wait=False)
+
+
+def session_for(url):
+    """Keep-alive ``requests.Session`` shared by all requests to the host of ``url``."""
+    host = urlsplit(url).netloc
+    with _sessions_lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(8, _request_workers))
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[host] = session
+        return session
+
+
+def breaker_for(url):
+    host = urlsplit(url).netloc
+    with _sessions_lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            breaker = _breakers[host] = CircuitBreaker()
+        return breaker
+
+
+def backoff_delay(attempt, retry_after=None):
+    """Seconds to wait before retry ``attempt`` (0-based): full jitter, capped."""
+    if retry_after is not None:
+        return min(retry_after, BACKOFF_MAX_S)
+    return random.uniform(0, min(BACKOFF_MAX_S, BACKOFF_S * 2 ** attempt))
+
+
+def _retry_after(response):
+    try:
+        return float(response.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _request(url, headers, params, timeout):
+    """One GET; returns the response (a 304 is returned as is)."""
+    host = urlsplit(url).netloc
+    t0 = time.perf_counter()
+    try:
+        response = session_for(url).get(url, headers=headers, params=params, timeout=timeout)
+        if response.status_code != 304:
+            response.raise_for_status()
+    except Exception:
+        registry.inc(UPSTREAM_ERRORS, host=host)
+        raise
+    finally:
+        registry.observe(UPSTREAM_SECONDS, time.perf_counter() - t0, host=host)
+    registry.inc(UPSTREAM_BYTES, len(response.content), host=host)
+    return response
+
+
+def _retryable(error):
+    if isinstance(error, requests.exceptions.HTTPError):
+        return error.response is not None and error.response.status_code in RETRY_STATUS
+    return isinstance(error, (requests.exceptions.Timeout, requests.exceptions.ConnectionError))
+
+
+def get_json(url, headers=None, params=None, timeout=TIMEOUT_S, retries=RETRIES):
+    """Decoded JSON body of a GET; a request identical to one in flight shares its result."""
+    key = (url, tuple(sorted((params or {}).items())), tuple(sorted((headers or {}).items())))
+    with _inflight_lock:
+        pending = _inflight.get(key)
+        if pending is None:
+            future = _inflight[key] = Future()
+    if pending is not None:
+        registry.inc(UPSTREAM_DEDUPED, host=urlsplit(url).netloc)
+        return pending.result()
+    try:
+        payload = _get_json(url, headers, params, timeout, retries)
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(payload)
+        return payload
+    finally:
+        with _inflight_lock:
+            del _inflight[key]
+
+
+def _get_json(url, headers, params, timeout, retries):
+    breaker = breaker_for(url)
+    host = urlsplit(url).netloc
+    key = (url, tuple(sorted((params or {}).items())))
+    headers = dict(headers or {})
+    with _validated_lock:
+        validated = _validated.get(key)
+    if validated is not None:
+        etag, modified, _ = validated
+        if etag:
+            headers["If-None-Match"] = etag
+        if modified:
+            headers["If-Modified-Since"] = modified
+    limiter = _limiters.get(host)
+    # The breaker counts calls, not attempts: retries stay within one call
+    trial = breaker.check(host)
+    for attempt in range(retries + 1):
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            response = _request(url, headers, params, timeout)
+        except requests.exceptions.RequestException as e:
+            if not _retryable(e):
+                # The host answered (e.g. 401/404): not an availability problem
+                breaker.success()
+                raise
+            if trial or attempt == retries:
+                # A failed trial is not retried: the breaker re-opens at once
+                breaker.failure(trial)
+                raise
+            registry.inc(UPSTREAM_RETRIES, host=host)
+            time.sleep(backoff_delay(attempt, _retry_after(e.response) if e.response is not None else None))
+            continue
+        except BaseException:
+            if trial:
+                # Anything else must not leave the half-open breaker waiting
+                breaker.failure(trial)
+            raise
+        breaker.success()
+        break
+    if response.status_code == 304 and validated is not None:
+        registry.inc(UPSTREAM_NOT_MODIFIED, host=host)
+        return validated[2]
+    with span("json_decode"):
+        payload = response.json()
+    etag, modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+    if etag or modified:
+        with _validated_lock:
+            _validated[key] = (etag, modified, payload)
+            _validated.move_to_end(key)
+            while len(_validated) > CONDITIONAL_ENTRIES:
+                _validated.popitem(last=False)
+    return payload
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    try:
+        return FetchResult(fn(), None, time.perf_counter() - t0)
+    except Exception as e:
+        return FetchResult(None, e, time.perf_counter() - t0)
+
+
+def fetch_all(tasks):
+    """Run ``{name: callable}`` concurrently; returns ``{name: FetchResult}``.
+
+    Errors are captured per task so one failing source does not hide the
+    other, and ``seconds`` is each task's own wall time.
+    """
+    futures = {name: _executor.submit(_timed, fn) for name, fn in tasks.items()}
+    return {name: future.result() for name, future in futures.items()}
+
+
+def iter_pages(url, pages, headers=None, params=None):
+    """``get_json`` for each page number in ``pages`` concurrently; yields ``(page, payload)`` as they arrive.
+
+    The page number is sent as the ``page`` query parameter. A failed page
+    raises and the pages not started yet are cancelled.
+    """
+    futures = {_request_executor.submit(get_json, url, headers, {**(params or {}), "page": page}): page for page in pages}
+    try:
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def get_many(requests_):
+    """Payloads of ``(url, params, headers)`` requests made concurrently, in order.
+
+    The first failure is raised and the requests not started yet are cancelled.
+    """
+    futures = [_request_executor.submit(get_json, url, headers, params) for url, params, headers in requests_]
+    try:
+        return [future.result() for future in futures]
+    finally:
+        for future in futures:
+            future.cancel()
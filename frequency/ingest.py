@@ -0,0 +1,123 @@
+"""Background ingestion, decoupled from Streamlit reruns.
+
+One ``IngestService`` per server process polls every registered source on
+its own schedule and publishes the result as an immutable, versioned
+``Snapshot``. Sources due within the same ``TICK_S`` are polled together
+over the shared fetch pool, so their requests overlap and identical ones
+are only sent once. Page scripts only read snapshots, so a rerun never waits on
+the network and upstream load does not depend on the number of viewers.
+"""
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from frequency.fetch import fetch_all
+from frequency.metrics import STAGE_SECONDS, registry
+
+# Sources due this close together are polled in one batch
+TICK_S = 5.0
+
+# ``frame`` is the last good result and must be treated as read-only; ``error``
+# is set when the latest poll failed (``frame`` is then from an older poll).
+# ``version`` only changes with the frame, so caches keyed on it survive failed polls
+Snapshot = namedtuple("Snapshot", ["version", "frame", "end", "fetched_at", "seconds", "error"])
+
+
+class IngestService:
+    def __init__(self, window):
+        self.window = window
+        self._sources = {}  # name -> (loader(start, end), every_s)
+        self._due = {}
+        self._snapshots = {}
+        # Bumped on every poll; the sequence number of each source's latest poll
+        self._version = 0
+        self._polled = {}
+        self._lock = threading.Lock()
+        self._published = threading.Condition(self._lock)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add_source(self, name, loader, every_s):
+        self._sources[name] = (loader, every_s)
+        self._due[name] = 0.0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="frequency-ingest", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def poll_now(self):
+        """Ask the worker to poll every source now; returns the current poll sequence number for ``wait_for``."""
+        for name in self._due:
+            self._due[name] = 0.0
+        self._wake.set()
+        with self._lock:
+            return self._version
+
+    def snapshot(self, name):
+        with self._lock:
+            return self._snapshots.get(name)
+
+    def wait_for(self, names, timeout, after_version=0):
+        """Latest snapshots of ``names``, waiting up to ``timeout`` for polls after ``after_version``.
+
+        Returns at once when all sources have published; it only blocks on a
+        cold start or after ``poll_now()``.
+        """
+        deadline = time.monotonic() + timeout
+        with self._published:
+            while not all(self._polled.get(n, 0) > after_version for n in names):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._published.wait(remaining)
+            return {n: self._snapshots.get(n) for n in names}
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            now = time.monotonic()
+            if min(self._due.values(), default=now + 1) <= now:
+                # Pull in the sources that would be due within the tick
+                due = [name for name, t in self._due.items() if t <= now + TICK_S]
+            else:
+                due = []
+            if due:
+                self._poll(due)
+            wait = min(self._due.values(), default=now + 1) - time.monotonic()
+            if wait > 0:
+                self._wake.wait(wait)
+
+    def _poll(self, names):
+        end = datetime.utcnow()
+        start = end - self.window
+        tasks = {name: (lambda loader=self._sources[name][0]: loader(start, end)) for name in names}
+        results = fetch_all(tasks)
+        for name, result in results.items():
+            registry.observe(STAGE_SECONDS, result.seconds, stage=f"load_{name}")
+        with self._published:
+            for name, result in results.items():
+                previous = self._snapshots.get(name)
+                self._version += 1
+                self._polled[name] = self._version
+                if result.error is None:
+                    snapshot = Snapshot(self._version, result.value, end, datetime.utcnow(), result.seconds, None)
+                elif previous is not None:
+                    # Same frame, same version: only the error and timing are new
+                    snapshot = previous._replace(seconds=result.seconds, error=result.error)
+                else:
+                    snapshot = Snapshot(self._version, None, None, None, result.seconds, result.error)
+                self._snapshots[name] = snapshot
+                self._due[name] = time.monotonic() + self._sources[name][1]
+            self._published.notify_all()
+        try:
+            registry.write_textfile()
+        except OSError:
+            # A bad export path must not stop ingestion
+            pass
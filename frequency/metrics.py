@@ -0,0 +1,212 @@
+"""Process-wide timing spans, counters and latency histograms.
+
+The fetch, transform, store and render code records into the module-level
+``registry``; the app shows it in the sidebar diagnostics panel and it can
+be exported in the Prometheus text format:
+
+- ``FREQUENCY_METRICS_FILE``: path rewritten after every ingest poll (for
+  the node_exporter textfile collector)
+- ``FREQUENCY_METRICS_PORT``: serve ``/metrics`` on this port
+"""
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram bucket upper bounds in seconds
+BUCKETS_S = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+STAGE_SECONDS = "frequency_stage_seconds"
+UPSTREAM_SECONDS = "frequency_upstream_seconds"
+UPSTREAM_BYTES = "frequency_upstream_bytes_total"
+UPSTREAM_ERRORS = "frequency_upstream_errors_total"
+UPSTREAM_RETRIES = "frequency_upstream_retries_total"
+UPSTREAM_NOT_MODIFIED = "frequency_upstream_not_modified_total"
+UPSTREAM_DEDUPED = "frequency_upstream_deduped_total"
+CACHE_REQUESTS = "frequency_cache_requests_total"
+
+HELP = {
+    STAGE_SECONDS: "Wall time of a pipeline stage.",
+    UPSTREAM_SECONDS: "Upstream HTTP request latency, including the body download.",
+    UPSTREAM_BYTES: "Response body bytes received from upstream.",
+    UPSTREAM_ERRORS: "Failed upstream HTTP requests.",
+    UPSTREAM_RETRIES: "Upstream requests retried after a transient failure.",
+    UPSTREAM_NOT_MODIFIED: "Conditional upstream requests answered with 304 Not Modified.",
+    UPSTREAM_DEDUPED: "Upstream requests served by an identical request already in flight.",
+    CACHE_REQUESTS: "Shared cache lookups by result.",
+}
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS_S):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        self.last = value
+
+    def copy(self):
+        other = Histogram(self.buckets)
+        other.counts = list(self.counts)
+        other.count, other.sum, other.max, other.last = self.count, self.sum, self.max, self.last
+        return other
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the ``q`` quantile (``inf`` past the last bucket)."""
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets + (float("inf"),), self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def _labels(pairs, extra=()):
+    pairs = tuple(pairs) + tuple(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def inc(self, name, amount=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram()
+            hist.observe(value)
+
+    @contextmanager
+    def span(self, stage):
+        """Record the wall time of the ``with`` block as ``stage``."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(STAGE_SECONDS, time.perf_counter() - t0, stage=stage)
+
+    def counters(self, name):
+        """``{labels: value}`` of one counter."""
+        with self._lock:
+            return {labels: v for (n, labels), v in self._counters.items() if n == name}
+
+    def histograms(self, name):
+        """``{labels: Histogram}`` copies of one histogram."""
+        with self._lock:
+            return {labels: hist.copy() for (n, labels), hist in self._histograms.items() if n == name}
+
+    def latency_rows(self, name):
+        """One row per label set of a histogram with counts and millisecond figures, for display."""
+        rows = []
+        for labels, hist in sorted(self.histograms(name).items()):
+            rows.append({
+                **dict(labels),
+                "n": hist.count,
+                "last_ms": hist.last * 1000,
+                "mean_ms": hist.sum / hist.count * 1000 if hist.count else 0.0,
+                "p95_ms": hist.quantile(0.95) * 1000,
+                "max_ms": hist.max * 1000,
+            })
+        return rows
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def prometheus(self):
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items())
+        lines = []
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                typed.add(name)
+                lines += [f"# HELP {name} {HELP.get(name, name)}", f"# TYPE {name} counter"]
+            lines.append(f"{name}{_labels(labels)} {value}")
+        for (name, labels), hist in histograms:
+            if name not in typed:
+                typed.add(name)
+                lines += [f"# HELP {name} {HELP.get(name, name)}", f"# TYPE {name} histogram"]
+            cumulative = 0
+            for bound, n in zip(hist.buckets + (float("inf"),), hist.counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{name}_bucket{_labels(labels, [('le', le)])} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {hist.sum}")
+            lines.append(f"{name}_count{_labels(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path=None):
+        """Atomically write ``prometheus()`` to ``path`` (default ``FREQUENCY_METRICS_FILE``)."""
+        path = path or os.environ.get("FREQUENCY_METRICS_FILE")
+        if not path:
+            return
+        with open(path + ".tmp", "w") as f:
+            f.write(self.prometheus())
+        os.replace(path + ".tmp", path)
+
+
+registry = Registry()
+span = registry.span
+
+_server = None
+_server_lock = threading.Lock()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port=None):
+    """Serve ``/metrics`` on ``port`` (default ``FREQUENCY_METRICS_PORT``) once per process."""
+    global _server
+    port = port or os.environ.get("FREQUENCY_METRICS_PORT")
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer(("", int(port)), _Handler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="frequency-metrics", daemon=True).start()
+        return _server
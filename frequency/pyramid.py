@@ -0,0 +1,128 @@
+"""Multi-resolution aggregate pyramid over a 1 s sample stream.
+
+Each level keeps one row of mergeable statistics (see ``frequency.stats``)
+per bucket (10 s, 1 min, 15 min, 1 h), so a bucket's mean, standard
+deviation, true extremes and band excursions are known and buckets can be
+merged. Levels are updated incrementally from newly appended samples; the
+1 s level is the raw data itself and is read from the store.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from frequency import stats
+
+S_NS = 1_000_000_000
+LEVELS_S = (10, 60, 900, 3600)
+
+
+def _empty_level():
+    return {"bucket": np.empty(0, dtype=np.int64), **stats.empty()}
+
+
+def aggregate(ts_ns, values, bucket_s):
+    """Aggregate sorted samples into ``bucket_s`` buckets."""
+    if not len(ts_ns):
+        return _empty_level()
+    bucket = ts_ns // (bucket_s * S_NS)
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(bucket)) + 1])
+    return {"bucket": bucket[starts], **stats.accumulate(values, starts, ts_ns, S_NS)}
+
+
+class Pyramid:
+    def __init__(self, keep, levels_s=LEVELS_S):
+        self.keep_ns = pd.Timedelta(keep).value
+        self.levels_s = tuple(levels_s)
+        self.lock = threading.Lock()
+        self.first = None
+        self.last = None
+        self.levels = {b: _empty_level() for b in self.levels_s}
+
+    def update_from(self, buffer):
+        """Feed the samples ``buffer`` gained since the last call.
+
+        If the buffer now reaches further back than the pyramid (it was
+        refilled for a wider window) the pyramid is rebuilt from it.
+        """
+        if not len(buffer):
+            return
+        with self.lock:
+            if self.first is None or buffer.first < self.first:
+                self.first = self.last = None
+                self.levels = {b: _empty_level() for b in self.levels_s}
+                ts, values = buffer.window(buffer.first, buffer.last + 1)
+            else:
+                ts, values = buffer.window(self.last + 1, np.iinfo(np.int64).max)
+            self._append(ts, values)
+
+    def _append(self, ts_ns, values):
+        if not len(ts_ns):
+            return
+        if self.first is None:
+            self.first = int(ts_ns[0])
+        self.last = int(ts_ns[-1])
+        cutoff = self.last - self.keep_ns
+        for b in self.levels_s:
+            level, new = self.levels[b], aggregate(ts_ns, values, b)
+            if not len(new["bucket"]):
+                continue
+            if len(level["bucket"]) and level["bucket"][-1] == new["bucket"][0]:
+                # The last bucket was still filling: merge the first new row into it
+                merged = stats.merge(stats.row(level, -1), stats.row(new, 0))
+                for c, v in merged.items():
+                    level[c][-1] = v
+                new = {k: v[1:] for k, v in new.items()}
+            level = {k: np.concatenate([level[k], new[k]]) for k in level}
+            keep = np.searchsorted(level["bucket"], cutoff // (b * S_NS))
+            self.levels[b] = {k: v[keep:] for k, v in level.items()}
+        self.first = max(self.first, cutoff)
+
+    def choose_level(self, start_ns, stop_ns, points):
+        """Finest level with at most ``points`` buckets in the range (1 = raw 1 s)."""
+        span_s = (stop_ns - start_ns) / S_NS
+        if span_s <= points:
+            return 1
+        return next((b for b in self.levels_s if span_s / b <= points), self.levels_s[-1])
+
+    def read(self, bucket_s, start_ns, stop_ns):
+        """Rows of a level whose bucket starts in ``[start_ns, stop_ns)`` as arrays."""
+        with self.lock:
+            level = self.levels[bucket_s]
+            lo, hi = np.searchsorted(level["bucket"], [-(-start_ns // (bucket_s * S_NS)), -(-stop_ns // (bucket_s * S_NS))])
+            return {k: v[lo:hi].copy() for k, v in level.items()}
+
+    def frame(self, bucket_s, start_ns, stop_ns):
+        """``Timestamp``/``mean``/``min``/``max`` frame of one level for charting."""
+        level = self.read(bucket_s, start_ns, stop_ns)
+        return pd.DataFrame({
+            "Timestamp": (level["bucket"] * (bucket_s * S_NS)).view("datetime64[ns]"),
+            "mean": level["mean"],
+            "min": level["min"],
+            "max": level["max"],
+        })
+
+    def summary(self, start_ns, stop_ns):
+        """Exact ``stats.summary`` of the 1 s samples in ``[start_ns, stop_ns)``.
+
+        Uses the coarsest level whose buckets line up with both ends of the
+        range, so the result equals a scan of the raw samples at a cost of
+        one row per bucket.
+        """
+        for b in reversed(self.levels_s):
+            step = b * S_NS
+            if start_ns % step == 0 and stop_ns % step == 0:
+                return stats.summary(stats.reduce(self.read(b, start_ns, stop_ns)))
+        return None
+
+
+def detail_frame(pyramid, store, source, start_ns, stop_ns, points):
+    """``(bucket_s, frame)`` at the finest resolution that fits ``points`` columns.
+
+    The 1 s level comes straight from the store, with min = max = mean.
+    """
+    bucket_s = pyramid.choose_level(start_ns, stop_ns, points)
+    if bucket_s > 1:
+        return bucket_s, pyramid.frame(bucket_s, start_ns, stop_ns)
+    ts, values = store.read(source, start_ns, stop_ns)
+    return 1, pd.DataFrame({"Timestamp": ts.view("datetime64[ns]"), "mean": values, "min": values, "max": values})
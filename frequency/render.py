@@ -0,0 +1,439 @@
+"""Plotly figure for the frequency comparison chart.
+
+``build_figure`` is deterministic in its inputs, so the app caches the
+result on (data version, theme, language, visibility, zoom) and only
+rebuilds it when one of those changes. Trace data goes out as binary
+typed arrays: x as epoch ms (float64, exact for ms; plotly.js has no int64
+arrays) and y as float32, which Plotly encodes as base64 ``bdata`` instead
+of ISO date strings and decimal text. ``stream_figure`` is the empty
+chart the live streaming component fills and extends (``frequency.stream``),
+``spectrum_figure``/``band_power_figure`` show ``frequency.spectral``
+results and ``basic_figure`` the plain chart of the single-language dashboards.
+
+Plotly is imported on first use, so the time helpers can be used without it.
+"""
+import numpy as np
+import pandas as pd
+
+from frequency.decimate import CHART_POINTS, decimate
+from frequency.metrics import span
+from frequency.stats import BAND_HIGH, BAND_LOW
+
+LOCAL_TZ = "Europe/Helsinki"
+# Above this many points a trace is drawn with WebGL and without markers
+WEBGL_POINTS = 1000
+# Candidate UTC tick spacings in minutes
+TICK_STEPS_MIN = [1, 2, 5, 10, 15, 30, 60, 120, 180, 360, 720, 1440]
+MAX_TICKS = 10
+# Spectral band shading and lines
+BAND_COLORS = ["#66BB6A", "#AB47BC", "#FF7043", "#26C6DA"]
+
+
+def to_local(ts):
+    """Naive UTC timestamps as Helsinki time."""
+    with span("tz_convert"):
+        return pd.DatetimeIndex(ts).tz_localize("UTC").tz_convert(LOCAL_TZ)
+
+
+def _datetimes(ts):
+    ts = np.asarray(ts)
+    return ts if ts.dtype.kind == "M" else ts.astype(np.int64).view("datetime64[ns]")
+
+
+def epoch_ms(ts):
+    """Naive UTC timestamps (datetimes or ``int64`` ns) as ``int64`` epoch ms."""
+    return pd.DatetimeIndex(_datetimes(ts)).as_unit("ms").asi8
+
+
+def local_ms(ts):
+    """Naive UTC timestamps as Helsinki wall time in epoch ms (a Plotly date axis value)."""
+    return to_local(_datetimes(ts)).tz_localize(None).as_unit("ms").asi8
+
+
+def _x(ts):
+    # Typed array x: float64 holds epoch ms exactly
+    return local_ms(ts).astype(np.float64)
+
+
+def _y(values):
+    # float32 is ample for frequencies shown to 3 decimals and halves the payload
+    return np.asarray(values, dtype=np.float32)
+
+
+def local_to_utc(t):
+    """Naive Helsinki wall time (e.g. from a slider) as naive UTC."""
+    local = pd.Timestamp(t).tz_localize(LOCAL_TZ, ambiguous=True, nonexistent="shift_forward")
+    return local.tz_convert("UTC").tz_localize(None)
+
+
+def utc_ticks(start, end, max_ticks=MAX_TICKS):
+    """Evenly spaced UTC tick positions (as local epoch ms) and ``HH:MM`` UTC labels."""
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    span_min = max((end - start).total_seconds() / 60, 1)
+    step = next((s for s in TICK_STEPS_MIN if span_min / s <= max_ticks), TICK_STEPS_MIN[-1])
+    ticks = pd.date_range(start.ceil(f"{step}min"), end, freq=f"{step}min")
+    return local_ms(ticks).tolist(), list(ticks.strftime("%H:%M"))
+
+
+def _level_label(bucket_s):
+    if bucket_s % 3600 == 0:
+        return f"{bucket_s // 3600} h"
+    if bucket_s % 60 == 0:
+        return f"{bucket_s // 60} min"
+    return f"{bucket_s} s"
+
+
+def _with_alpha(hex_color, alpha):
+    r, g, b = (int(hex_color[i:i + 2], 16) for i in (1, 3, 5))
+    return f"rgba({r},{g},{b},{alpha})"
+
+
+def _scatter(n, **kwargs):
+    import plotly.graph_objects as go
+
+    if n > WEBGL_POINTS:
+        kwargs["mode"] = "lines"
+        kwargs.pop("marker", None)
+        return go.Scattergl(**kwargs)
+    return go.Scatter(**kwargs)
+
+
+def build_figure(df, lang, colors, show_nordic=True, show_suomi=True, detail=None, zoom=None, nordic_mean="1 min"):
+    """Comparison chart for a merged frame (naive UTC ``Timestamp``).
+
+    ``detail`` is an optional ``(bucket_s, frame)`` of Nordic data from the
+    aggregate pyramid (``Timestamp``, ``mean``, ``min``, ``max``) and
+    ``zoom`` an optional ``(start, end)`` in naive local time.
+    ``nordic_mean`` is the period the Nordic values are averaged over.
+    """
+    import plotly.graph_objects as go
+
+    fin = lang == "Suomi"
+    x_local = _x(df["Timestamp"])
+    fig = go.Figure()
+
+    # Warning areas
+    x_start = x_local.min()
+    x_end = x_local.max()
+    y_min = df[["FrequencyHz_Suomi", "FrequencyHz_Nordic"]].min().min()
+    y_max = df[["FrequencyHz_Suomi", "FrequencyHz_Nordic"]].max().max()
+    if detail is not None:
+        bucket_s, detail_df = detail
+        if detail_df["min"].notna().any():
+            y_min = min(y_min, detail_df["min"].min())
+            y_max = max(y_max, detail_df["max"].max())
+    y_axis_min = y_min - 0.05
+    y_axis_max = y_max + 0.05
+
+    fig.add_shape(
+        type="rect", xref="x", yref="y",
+        x0=x_start, x1=x_end,
+        y0=y_axis_min, y1=min(BAND_LOW, y_axis_max),
+        fillcolor="rgba(255,82,82,0.13)", line_width=0, layer="below"
+    )
+    fig.add_shape(
+        type="rect", xref="x", yref="y",
+        x0=x_start, x1=x_end,
+        y0=max(BAND_HIGH, y_axis_min), y1=y_axis_max,
+        fillcolor="rgba(66,165,245,0.13)", line_width=0, layer="below"
+    )
+
+    # Nordic frequency
+    x_nordic, y_nordic = decimate(x_local, df["FrequencyHz_Nordic"], CHART_POINTS)
+    fig.add_trace(_scatter(
+        len(y_nordic),
+        x=x_nordic,
+        y=_y(y_nordic),
+        mode="lines+markers",
+        name=f"Nordic ({nordic_mean})",
+        line=dict(color=colors["nordic"], width=3),
+        marker=dict(size=7, symbol="circle"),
+        visible=show_nordic,
+        hovertemplate=("Aika: %{x}<br>Nordic: %{y:.3f} Hz<extra></extra>" if fin else "Time: %{x}<br>Nordic: %{y:.3f} Hz<extra></extra>")
+    ))
+
+    # Finland frequency
+    x_suomi, y_suomi = decimate(x_local, df["FrequencyHz_Suomi"], CHART_POINTS)
+    fig.add_trace(_scatter(
+        len(y_suomi),
+        x=x_suomi,
+        y=_y(y_suomi),
+        mode="lines+markers",
+        name="Suomi (3 min)" if fin else "Finland (3 min)",
+        line=dict(color=colors["finland"], width=3),
+        marker=dict(size=7, symbol="diamond"),
+        visible=show_suomi,
+        hovertemplate=("Aika: %{x}<br>Suomi: %{y:.3f} Hz<extra></extra>" if fin else "Time: %{x}<br>Finland: %{y:.3f} Hz<extra></extra>")
+    ))
+
+    # Nordic detail: 1 s samples, or the min-max band and mean of a coarser level
+    if detail is not None:
+        label = _level_label(bucket_s)
+        if bucket_s > 1:
+            x_detail = _x(detail_df["Timestamp"])
+            fig.add_trace(_scatter(
+                len(detail_df), x=x_detail, y=_y(detail_df["max"]), mode="lines",
+                line=dict(width=0), showlegend=False, hoverinfo="skip", legendgroup="detail"
+            ))
+            fig.add_trace(_scatter(
+                len(detail_df), x=x_detail, y=_y(detail_df["min"]), mode="lines",
+                line=dict(width=0), fill="tonexty", fillcolor=_with_alpha(colors["nordic"], 0.25),
+                name=f"Nordic {label} min–max", legendgroup="detail", hoverinfo="skip"
+            ))
+        x_mean, y_mean = decimate(detail_df["Timestamp"].to_numpy(), detail_df["mean"].to_numpy(), CHART_POINTS)
+        fig.add_trace(_scatter(
+            len(y_mean),
+            x=_x(x_mean),
+            y=_y(y_mean),
+            mode="lines",
+            name=f"Nordic ({label})",
+            line=dict(color=colors["nordic"], width=1),
+            opacity=0.6,
+            legendgroup="detail",
+            hovertemplate=(f"Aika: %{{x}}<br>Nordic {label}: %{{y:.3f}} Hz<extra></extra>" if fin else f"Time: %{{x}}<br>Nordic {label}: %{{y:.3f}} Hz<extra></extra>")
+        ))
+
+    # Axes and layout
+    tick_start, tick_end = df["Timestamp"].min(), df["Timestamp"].max()
+    if zoom is not None:
+        tick_start, tick_end = (local_to_utc(t) for t in zoom)
+    tickvals, ticktext = utc_ticks(tick_start, tick_end)
+    fig.update_layout(
+        xaxis=dict(
+            title=dict(text="Aika (Suomen aika)" if fin else "Time (Helsinki)", font=dict(size=22)),
+            type="date",
+            tickformat="%H:%M",
+            domain=[0.0, 1.0],
+            anchor="y",
+            tickfont=dict(size=18),
+            fixedrange=False  # allow zoom/pan
+        ),
+        xaxis2=dict(
+            title=dict(text="Aika (UTC)" if fin else "Time (UTC)", font=dict(size=20)),
+            type="date",
+            overlaying="x",
+            matches="x",
+            side="top",
+            tickvals=tickvals,
+            ticktext=ticktext,
+            showgrid=False,
+            tickfont=dict(size=16),
+            fixedrange=False
+        ),
+        yaxis=dict(
+            title=dict(text="Taajuus (Hz)" if fin else "Frequency (Hz)", font=dict(size=22)),
+            range=[y_axis_min, y_axis_max],
+            tickfont=dict(size=18),
+            fixedrange=False
+        ),
+        dragmode="zoom",  # allow box zoom (both axes)
+        height=1100,
+        margin=dict(t=60, b=40, l=60, r=40),
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1,
+            font=dict(size=18)
+        ),
+        title=dict(
+            text=f"Taajuusvertailu: Nordic ({nordic_mean}) & Suomi (3 min)" if fin else f"Frequency Comparison: Nordic ({nordic_mean}) & Finland (3 min)",
+            font=dict(size=26)
+        ),
+        plot_bgcolor=colors["plot_bg"],
+        paper_bgcolor=colors["paper"]
+    )
+    if zoom is not None:
+        fig.update_xaxes(range=[zoom[0], zoom[1]])
+    return fig
+
+
+def stream_figure(lang, colors, show_nordic=True, show_suomi=True, show_raw=False, nordic_mean="1 min"):
+    """Live streaming chart without data: traces Nordic means, Finland and, with ``show_raw``, Nordic 1 s.
+
+    x values are Helsinki wall time as epoch ms. The warning bands span the
+    plot width, so they need no update as the window slides, and the y axis
+    scales to the data.
+    """
+    import plotly.graph_objects as go
+
+    fin = lang == "Suomi"
+    fig = go.Figure()
+    for y0, y1, color in [(0, BAND_LOW, "rgba(255,82,82,0.13)"), (BAND_HIGH, 100, "rgba(66,165,245,0.13)")]:
+        fig.add_shape(
+            type="rect", xref="paper", yref="y", x0=0, x1=1, y0=y0, y1=y1,
+            fillcolor=color, line_width=0, layer="below"
+        )
+    # WebGL throughout: the traces grow with every tick
+    fig.add_trace(go.Scattergl(
+        x=[], y=[], mode="lines+markers", name=f"Nordic ({nordic_mean})",
+        line=dict(color=colors["nordic"], width=3), marker=dict(size=7, symbol="circle"), visible=show_nordic,
+        hovertemplate=("Aika: %{x}<br>Nordic: %{y:.3f} Hz<extra></extra>" if fin else "Time: %{x}<br>Nordic: %{y:.3f} Hz<extra></extra>")
+    ))
+    fig.add_trace(go.Scattergl(
+        x=[], y=[], mode="lines+markers", name="Suomi (3 min)" if fin else "Finland (3 min)",
+        line=dict(color=colors["finland"], width=3), marker=dict(size=7, symbol="diamond"), visible=show_suomi,
+        hovertemplate=("Aika: %{x}<br>Suomi: %{y:.3f} Hz<extra></extra>" if fin else "Time: %{x}<br>Finland: %{y:.3f} Hz<extra></extra>")
+    ))
+    if show_raw:
+        fig.add_trace(go.Scattergl(
+            x=[], y=[], mode="lines", name="Nordic (1 s)",
+            line=dict(color=colors["nordic"], width=1), opacity=0.6,
+            hovertemplate=("Aika: %{x}<br>Nordic 1 s: %{y:.3f} Hz<extra></extra>" if fin else "Time: %{x}<br>Nordic 1 s: %{y:.3f} Hz<extra></extra>")
+        ))
+    fig.update_layout(
+        xaxis=dict(
+            title=dict(text="Aika (Suomen aika)" if fin else "Time (Helsinki)", font=dict(size=22)),
+            type="date",
+            tickformat="%H:%M",
+            tickfont=dict(size=18),
+        ),
+        yaxis=dict(
+            title=dict(text="Taajuus (Hz)" if fin else "Frequency (Hz)", font=dict(size=22)),
+            tickfont=dict(size=18),
+        ),
+        dragmode="zoom",
+        margin=dict(t=60, b=40, l=60, r=40),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1, font=dict(size=18)),
+        title=dict(
+            text=f"Taajuusvertailu: Nordic ({nordic_mean}) & Suomi (3 min)" if fin else f"Frequency Comparison: Nordic ({nordic_mean}) & Finland (3 min)",
+            font=dict(size=26)
+        ),
+        plot_bgcolor=colors["plot_bg"],
+        paper_bgcolor=colors["paper"],
+        # st.plotly_chart applies the Streamlit theme; the component has to set the text colour
+        font=dict(color=colors["fg"]),
+    )
+    return fig
+
+
+def spectrum_figure(freqs, psd, lang, colors, bands, labels, segments):
+    """Log-log Welch PSD of the Nordic 1 s samples with the ``bands`` (name -> Hz range) shaded."""
+    import plotly.graph_objects as go
+
+    fin = lang == "Suomi"
+    fig = go.Figure()
+    for i, (name, (low, high)) in enumerate(bands.items()):
+        color = BAND_COLORS[i % len(BAND_COLORS)]
+        fig.add_vrect(x0=low, x1=high, fillcolor=color, opacity=0.12, line_width=0, layer="below")
+        # Legend entry for the shaded band (shapes have none)
+        fig.add_trace(go.Scatter(
+            x=[None], y=[None], mode="markers", name=f"{labels.get(name, name)} ({low:g}–{high:g} Hz)",
+            marker=dict(color=color, symbol="square", size=12)
+        ))
+    # DC is not plotted on a log axis
+    fig.add_trace(go.Scatter(
+        x=freqs[1:], y=_y(psd[1:]), mode="lines", name="PSD", showlegend=False,
+        line=dict(color=colors["nordic"], width=2),
+        hovertemplate=("%{x:.4f} Hz (jakso %{customdata:.0f} s)<br>%{y:.2e} Hz²/Hz<extra></extra>" if fin else "%{x:.4f} Hz (period %{customdata:.0f} s)<br>%{y:.2e} Hz²/Hz<extra></extra>"),
+        customdata=_y(1 / freqs[1:]),
+    ))
+    fig.update_layout(
+        xaxis=dict(title="Taajuus (Hz)" if fin else "Frequency (Hz)", type="log"),
+        yaxis=dict(title="Tehotiheys (Hz²/Hz)" if fin else "Power density (Hz²/Hz)", type="log", exponentformat="power"),
+        title=(f"Tehospektri (Welch, {segments} segmenttiä)" if fin else f"Power spectrum (Welch, {segments} segments)"),
+        height=450,
+        margin=dict(t=60, b=40, l=60, r=40),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        plot_bgcolor=colors["plot_bg"],
+        paper_bgcolor=colors["paper"],
+    )
+    return fig
+
+
+def band_power_figure(frame, lang, colors, labels):
+    """Rolling RMS (mHz) per band over time; ``frame`` is ``SpectralIndex.band_power`` output."""
+    import plotly.graph_objects as go
+
+    fin = lang == "Suomi"
+    fig = go.Figure()
+    x = _x(frame["Timestamp"])
+    for i, name in enumerate(c for c in frame.columns if c != "Timestamp"):
+        label = labels.get(name, name)
+        fig.add_trace(go.Scatter(
+            x=x, y=_y(np.sqrt(frame[name].to_numpy()) * 1000), mode="lines+markers", name=label,
+            line=dict(color=BAND_COLORS[i % len(BAND_COLORS)], width=2), marker=dict(size=5),
+            hovertemplate=f"%{{x|%H:%M}}<br>{label}: %{{y:.2f}} mHz<extra></extra>",
+        ))
+    fig.update_layout(
+        xaxis=dict(title="Aika (Suomen aika)" if fin else "Time (Helsinki)", type="date", tickformat="%H:%M"),
+        yaxis=dict(title="RMS-vaihtelu (mHz)" if fin else "RMS variation (mHz)", rangemode="tozero"),
+        title="Kaistateho ajan yli" if fin else "Band power over time",
+        height=400,
+        margin=dict(t=60, b=40, l=60, r=40),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        plot_bgcolor=colors["plot_bg"],
+        paper_bgcolor=colors["paper"],
+    )
+    return fig
+
+
+def basic_figure(df, nordic_label="Norja"):
+    """Finnish-only comparison chart; ``df`` is merged with ``_Suomi``/``_{nordic_label}`` suffixes."""
+    import plotly.graph_objects as go
+
+    nordic = f"FrequencyHz_{nordic_label}"
+    x_local = _x(df["Timestamp"])
+    fig = go.Figure()
+
+    # Varoitusalueet
+    x_start = x_local.min()
+    x_end = x_local.max()
+    y_min = df[["FrequencyHz_Suomi", nordic]].min().min()
+    y_max = df[["FrequencyHz_Suomi", nordic]].max().max()
+    y_axis_min = y_min - 0.05
+    y_axis_max = y_max + 0.05
+
+    fig.add_shape(
+        type="rect", xref="x", yref="y",
+        x0=x_start, x1=x_end,
+        y0=y_axis_min, y1=min(BAND_LOW, y_axis_max),
+        fillcolor="rgba(255,0,0,0.1)", line_width=0, layer="below"
+    )
+    fig.add_shape(
+        type="rect", xref="x", yref="y",
+        x0=x_start, x1=x_end,
+        y0=max(BAND_HIGH, y_axis_min), y1=y_axis_max,
+        fillcolor="rgba(0,0,255,0.1)", line_width=0, layer="below"
+    )
+
+    fig.add_trace(go.Scatter(
+        x=x_local, y=_y(df[nordic]),
+        mode="lines+markers", name=f"{nordic_label} (1 min)", line=dict(color="black")
+    ))
+    fig.add_trace(go.Scatter(
+        x=x_local, y=_y(df["FrequencyHz_Suomi"]),
+        mode="lines+markers", name="Suomi (3 min)", line=dict(color="green")
+    ))
+
+    # Aikajanat: UTC-akselille vain tasavälein sijoitetut tikit, ei jokaista pistettä
+    tickvals, ticktext = utc_ticks(df["Timestamp"].min(), df["Timestamp"].max())
+    fig.update_layout(
+        xaxis=dict(
+            title="Aika (Suomen aika)",
+            type="date",
+            tickformat="%H:%M",
+            domain=[0.0, 1.0],
+            anchor="y"
+        ),
+        xaxis2=dict(
+            title="Aika (UTC)",
+            type="date",
+            overlaying="x",
+            matches="x",
+            side="top",
+            tickvals=tickvals,
+            ticktext=ticktext,
+            showgrid=False
+        ),
+        yaxis=dict(
+            title="Taajuus (Hz)",
+            range=[y_axis_min, y_axis_max]
+        ),
+        height=600,
+        margin=dict(t=60, b=40, l=60, r=40),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        title=f"Taajuusvertailu: {nordic_label} (1 min) & Suomi (3 min)"
+    )
+    return fig
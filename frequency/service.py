@@ -0,0 +1,44 @@
+"""Wiring of the live dashboard's background ingestion.
+
+``build_ingest`` creates the buffers and the ``IngestService`` the bilingual
+dashboard shares between sessions; the Streamlit script only wraps it in
+``st.cache_resource``.
+"""
+from datetime import timedelta
+
+from frequency.adapters import register, registered
+from frequency.buffer import GridBuffer, RollingBuffer
+from frequency.ingest import IngestService
+from frequency.sources import NORDIC, FingridDataset, load
+
+# Chart interval choices (label -> minutes)
+INTERVAL_MINUTES = {"10 min": 10, "30 min": 30, "1 h": 60, "3 h": 180}
+# Extra history kept in the buffers beyond the longest interval
+BUFFER_SLACK = timedelta(minutes=10)
+
+
+def build_ingest(api_key, store=None, pyramid=None, window=None, events=None, adapters=None, spectra=None):
+    """Started ``IngestService`` polling every registered source (or ``adapters``) over ``window``.
+
+    ``api_key`` is set on the Fingrid dataset 177 adapter; ``pyramid``,
+    ``events`` and ``spectra`` are fed the Nordic 1 s samples.
+    """
+    window = window or timedelta(minutes=max(INTERVAL_MINUTES.values()))
+    if api_key:
+        register(FingridDataset(api_key=api_key))
+    service = IngestService(window)
+    for adapter in adapters or registered():
+        # Per-source buffers: a poll only fetches data newer than the last timestamp.
+        # Evenly spaced series are kept as 2-byte offsets on an implicit time grid
+        if adapter.period:
+            buffer = GridBuffer(window + BUFFER_SLACK, period=adapter.period)
+        else:
+            buffer = RollingBuffer(window + BUFFER_SLACK)
+        feeds = (pyramid, events, spectra) if adapter.name == NORDIC.name else (None, None, None)
+        service.add_source(
+            adapter.name,
+            lambda start, end, adapter=adapter, buffer=buffer, feeds=feeds: load(adapter, buffer, start, end, store, *feeds),
+            every_s=adapter.poll_s,
+        )
+    service.start()
+    return service
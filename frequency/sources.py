@@ -0,0 +1,210 @@
+"""Statnett and Fingrid frequency sources.
+
+Each source is a ``SourceAdapter`` in the registry: ``StatnettFrequency``
+(the Nordic 1 s series) and ``FingridDataset`` (dataset 177 by default, or
+any other Fingrid frequency dataset). ``fetch_nordic``/``fetch_finnish``
+return the frame for an explicit time range without keeping any state.
+``load`` updates a source's ``RollingBuffer`` with data newer than its
+last sample and returns the requested window as a frame. With a
+``FrequencyStore`` it reads what is already on disk first and only goes to
+the network for the ranges the store has not covered yet. Nothing here
+touches Streamlit, so it can run in worker threads; errors are raised to
+the caller.
+
+``FREQUENCY_STATNETT_URL`` and ``FREQUENCY_FINGRID_URL`` point the sources at
+another server, such as the benchmark stub.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from frequency.adapters import Request, SourceAdapter, register
+from frequency.buffer import statnett_days
+from frequency.cache import CADENCE_S
+from frequency.fetch import get_json, iter_pages, set_rate_limit
+from frequency.metrics import span
+from frequency.transform import minute_frame, minute_range_ns, parse_bysecond, parse_fingrid, parse_fingrid_into, sample_times
+
+STATNETT_URL = os.environ.get("FREQUENCY_STATNETT_URL", "https://driftsdata.statnett.no/restapi/Frequency/BySecond")
+FINGRID_URL = os.environ.get("FREQUENCY_FINGRID_URL", "https://data.fingrid.fi/api/datasets/177/data")
+# Largest page the Fingrid API serves (its default is 10 rows)
+FINGRID_PAGE_SIZE = 20_000
+# Fingrid's open data API allows 10 requests a minute per key: keep a margin
+FINGRID_PER_S = 9 / 60
+FINGRID_BURST = 9
+
+set_rate_limit(FINGRID_URL, FINGRID_PER_S, burst=FINGRID_BURST)
+
+
+class StatnettFrequency(SourceAdapter):
+    """Statnett Nordic frequency, 1 s samples shown as 1-minute means."""
+
+    name = "nordic"
+    cadence_s = CADENCE_S["nordic"]
+    poll_s = 30
+    period = "1s"
+
+    def requests(self, lo_ns, hi_ns):
+        # Statnett API only supports date, not time, so fetch whole days and keep the range
+        return [Request(STATNETT_URL, {"From": day}, None) for day in statnett_days(lo_ns, pd.Timestamp(hi_ns))]
+
+    def parse(self, payload, lo_ns):
+        start_ns, period_ns, values = parse_bysecond(payload, lo_ns)
+        return sample_times(start_ns, period_ns, len(values)), values
+
+    def window(self, start, end):
+        # Only the minutes in the selected range are averaged
+        return minute_range_ns(start, end)
+
+    def frame(self, ts_ns, values):
+        return minute_frame(ts_ns, values)
+
+
+class FingridDataset(SourceAdapter):
+    """A Fingrid open data frequency dataset; the API key falls back to ``FINGRID_API_KEY``."""
+
+    cadence_s = CADENCE_S["finnish"]
+    poll_s = 60
+    backfill_days = 30
+
+    def __init__(self, dataset=177, name="finnish", api_key=None, cadence_s=None):
+        self.dataset = dataset
+        self.name = name
+        self.api_key = api_key
+        if cadence_s is not None:
+            self.cadence_s = cadence_s
+        # Same server as dataset 177, so FREQUENCY_FINGRID_URL applies to all datasets
+        self.url = FINGRID_URL.replace("/datasets/177/", f"/datasets/{dataset}/")
+
+    def headers(self):
+        return {"x-api-key": self.api_key or os.environ.get("FINGRID_API_KEY", "")}
+
+    def params(self, lo_ns, hi_ns):
+        since = pd.Timestamp(lo_ns).ceil("s")
+        return {
+            "startTime": f"{since.isoformat()}Z",
+            "endTime": f"{pd.Timestamp(hi_ns).isoformat()}Z",
+            "pageSize": FINGRID_PAGE_SIZE,
+            "sortBy": "startTime",
+            "sortOrder": "asc",
+        }
+
+    def requests(self, lo_ns, hi_ns):
+        # Only the first page: fetch_range asks for the others once it knows how many there are
+        return [Request(self.url, {**self.params(lo_ns, hi_ns), "page": 1}, self.headers())]
+
+    def parse(self, payload, lo_ns):
+        return parse_fingrid(payload)
+
+    def fetch_range(self, lo_ns, hi_ns):
+        """Points with ``lo_ns <= ts <= hi_ns`` as ``(ts_ns, values)``.
+
+        The first page gives the row count: the other pages are then fetched
+        concurrently and parsed straight into one array pair of that size.
+        """
+        headers, params = self.headers(), self.params(lo_ns, hi_ns)
+        first = get_json(self.url, headers=headers, params={**params, "page": 1})
+        pagination = first.get("pagination") or {}
+        rows = first.get("data") or []
+        per_page = int(pagination.get("perPage") or max(len(rows), 1))
+        last_page = int(pagination.get("lastPage") or 1)
+        total = max(int(pagination.get("total") or 0), len(rows))
+        # Room for every page the first one announced, even if the total changes meanwhile
+        size = max(total, last_page * per_page)
+        ts, values = np.empty(size, dtype=np.int64), np.empty(size)
+        # Rows per page, as the row count can change between page requests
+        filled = {1: parse_fingrid_into(first, ts, values)}
+        for page, payload in iter_pages(self.url, range(2, last_page + 1), headers, params):
+            filled[page] = parse_fingrid_into(payload, ts, values, (page - 1) * per_page)
+        if all(filled[page] == per_page for page in range(1, last_page)):
+            n = (last_page - 1) * per_page + filled[last_page]
+            return ts[:n], values[:n]
+        keep = np.concatenate([np.arange((page - 1) * per_page, (page - 1) * per_page + n) for page, n in sorted(filled.items())])
+        return ts[keep], values[keep]
+
+
+NORDIC = register(StatnettFrequency())
+FINNISH = register(FingridDataset())
+
+
+def fetch_nordic_range(lo_ns, hi_ns):
+    """Raw Statnett samples with ``lo_ns <= ts <= hi_ns`` as ``(ts_ns, values)``."""
+    return NORDIC.fetch_range(lo_ns, hi_ns)
+
+
+def fetch_finnish_range(lo_ns, hi_ns, api_key):
+    """Fingrid dataset 177 points with ``lo_ns <= ts <= hi_ns`` as ``(ts_ns, values)``."""
+    return FingridDataset(api_key=api_key).fetch_range(lo_ns, hi_ns)
+
+
+def refresh(buffer, source, start, end, fetch_range, store=None):
+    """Bring ``buffer`` up to ``end``; the caller holds ``buffer.lock``."""
+    since = buffer.resume_from(start)
+    end_ns = pd.Timestamp(end).value
+    if store is None:
+        buffer.append(*fetch_range(since, end_ns))
+        return
+    for lo, hi in store.missing(source, since, end_ns):
+        ts, values = fetch_range(lo, hi)
+        with span("store_write"):
+            if hi < end_ns:
+                # A gap before data already stored is complete once fetched
+                store.write(source, ts, values, covered=(lo, hi))
+            elif len(ts):
+                # At the live edge only mark up to the newest sample: later ones may not be published yet
+                store.write(source, ts, values, covered=(lo, int(ts[-1])))
+    with span("store_read"):
+        ts, values = store.read(source, since, end_ns + 1)
+    buffer.append(ts, values)
+
+
+def load(adapter, buffer, start, end, store=None, pyramid=None, events=None, spectra=None):
+    """Frame of ``adapter``'s series for ``start``..``end`` (naive UTC).
+
+    ``pyramid``, ``events`` (an ``EventDetector``) and ``spectra`` (a
+    ``SpectralIndex``) are fed the new samples.
+    """
+    with buffer.lock:
+        refresh(buffer, adapter.name, start, end, adapter.fetch_range, store)
+        if pyramid is not None:
+            with span("pyramid_update"):
+                pyramid.update_from(buffer)
+        if events is not None:
+            with span("detect_events"):
+                events.update_from(buffer)
+        if spectra is not None:
+            with span("spectral_update"):
+                spectra.update_from(buffer)
+        ts, values = buffer.window(*adapter.window(start, end))
+    if not len(ts):
+        return pd.DataFrame()
+    return adapter.frame(ts, values)
+
+
+def load_nordic(buffer, start, end, store=None, pyramid=None, events=None, spectra=None):
+    """1-minute Nordic means for ``start``..``end`` (naive UTC)."""
+    return load(NORDIC, buffer, start, end, store, pyramid, events, spectra)
+
+
+def load_finnish(buffer, start, end, api_key, store=None):
+    """Fingrid dataset 177 (3 min) points for ``start``..``end`` (naive UTC)."""
+    return load(FingridDataset(api_key=api_key), buffer, start, end, store)
+
+
+def fetch_nordic(start, end):
+    """1-minute Nordic means for ``start``..``end`` (naive UTC), straight from Statnett."""
+    lo, hi = minute_range_ns(start, end)
+    ts, values = fetch_nordic_range(lo, hi - 1)
+    if not len(ts):
+        return pd.DataFrame()
+    return minute_frame(ts, values)
+
+
+def fetch_finnish(start, end, api_key):
+    """Fingrid dataset 177 points for ``start``..``end`` (naive UTC), straight from Fingrid."""
+    ts, values = fetch_finnish_range(pd.Timestamp(start).value, pd.Timestamp(end).value, api_key)
+    if not len(ts):
+        return pd.DataFrame()
+    return pd.DataFrame({"Timestamp": ts.view("datetime64[ns]"), "FrequencyHz": values})
+
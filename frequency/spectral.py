@@ -0,0 +1,208 @@
+"""Spectral analysis of the 1 s Nordic samples: Welch PSD and band power.
+
+The minute means hide anything faster than a few minutes. On the 1 s
+samples, oscillations up to the 0.5 Hz Nyquist limit show up as peaks in
+the power spectral density, and their strength over time as band power:
+
+- ``slow``: 0.002–0.01 Hz, load-generation balancing
+- ``governor``: 0.01–0.1 Hz, turbine governor and FCR hunting
+- ``inter_area``: 0.1–0.5 Hz, inter-area electromechanical oscillations
+  (the lower part; faster modes are beyond 1 s sampling)
+
+Samples are cut into Hann-windowed segments of ``SEGMENT_S`` starting every
+``STEP_S`` seconds on a fixed grid, and each segment's periodogram is one
+row of a ``SpectralIndex``, computed with a single vectorized ``rfft`` for
+all new segments. Welch's PSD over any window is the mean of the rows
+inside it and the rolling band power is the per-segment sum over a band,
+so a refresh only transforms the segments completed since the last one.
+Being on a fixed grid, the rows are the same however the samples arrive.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+S_NS = 1_000_000_000
+FS_HZ = 1.0
+SEGMENT_S = 512
+STEP_S = SEGMENT_S // 2
+# Segments with more missing samples than this are skipped; fewer are interpolated
+MAX_MISSING = 0.05
+BANDS = {
+    "slow": (0.002, 0.01),
+    "governor": (0.01, 0.1),
+    "inter_area": (0.1, 0.5),
+}
+
+
+def frequencies(segment_s=SEGMENT_S):
+    """Frequencies (Hz) of the periodogram bins."""
+    return np.fft.rfftfreq(segment_s, d=1 / FS_HZ)
+
+
+def hann(n):
+    """Periodic Hann window, as used for Welch's method."""
+    return 0.5 - 0.5 * np.cos(2 * np.pi * np.arange(n) / n)
+
+
+def periodograms(values, segment_s=SEGMENT_S, step_s=STEP_S):
+    """One-sided PSD (Hz²/Hz) of each segment of ``values`` starting every ``step_s`` samples.
+
+    ``values`` must not contain NaN. Each segment has its mean removed
+    (Welch's constant detrend).
+    """
+    segments = np.lib.stride_tricks.sliding_window_view(values, segment_s)[::step_s]
+    window = hann(segment_s)
+    spectrum = np.fft.rfft((segments - segments.mean(axis=1, keepdims=True)) * window, axis=1)
+    psd = (spectrum.real ** 2 + spectrum.imag ** 2) / (FS_HZ * (window ** 2).sum())
+    # One-sided: fold the negative frequencies in, except DC and Nyquist
+    psd[:, 1:-1 if segment_s % 2 == 0 else None] *= 2
+    return psd
+
+
+def welch(values, segment_s=SEGMENT_S, step_s=STEP_S):
+    """``(freqs, psd)`` of Welch's method over ``values`` in one go (no NaN)."""
+    return frequencies(segment_s), periodograms(values, segment_s, step_s).mean(axis=0)
+
+
+def _fill(values, offset, segment_s, step_s, n_segments):
+    """``values`` with NaN interpolated, and which segments (from ``offset`` on) have few enough missing samples."""
+    missing = np.isnan(values)
+    counts = np.concatenate([[0], np.cumsum(missing)])
+    starts = offset + np.arange(n_segments) * step_s
+    ok = counts[starts + segment_s] - counts[starts] <= MAX_MISSING * segment_s
+    if missing.any():
+        valid = np.flatnonzero(~missing)
+        if not len(valid):
+            return values, np.zeros(n_segments, dtype=bool)
+        values = values.copy()
+        values[missing] = np.interp(np.flatnonzero(missing), valid, values[valid])
+    return values, ok
+
+
+class SpectralIndex:
+    """Periodograms of the segments of an evenly spaced 1 s sample stream.
+
+    Fed newly arrived samples like the pyramid and the event detector; keeps
+    only the samples of the segment still being filled, plus the last valid
+    sample before them. Missing samples are interpolated between the valid
+    samples around them, so a segment waits for a valid sample after its
+    last missing one and the rows do not depend on how samples arrive.
+    """
+
+    def __init__(self, keep, segment_s=SEGMENT_S, step_s=STEP_S, period_ns=S_NS):
+        self.keep_ns = pd.Timedelta(keep).value
+        self.segment_s = segment_s
+        self.step_s = step_s
+        self.period_ns = period_ns
+        self.freqs = frequencies(segment_s)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.first = None
+        self.last = None
+        # Samples from the next segment start on
+        self.ts = np.empty(0, dtype=np.int64)
+        self.values = np.empty(0)
+        # Start of the next segment to compute; None after a gap
+        self.next_start = None
+        self.starts = np.empty(0, dtype=np.int64)
+        self.psd = np.empty((0, len(self.freqs)))
+        # Bumped whenever segments are added, for caching results derived from them
+        self.version = 0
+
+    def __len__(self):
+        return len(self.starts)
+
+    def update_from(self, buffer):
+        """Add the segments completed by the samples ``buffer`` gained since the last call.
+
+        A buffer that now reaches further back than what was seen (it was
+        refilled for a wider window) is rescanned.
+        """
+        if not len(buffer):
+            return
+        with self.lock:
+            if self.first is None or buffer.first < self.first:
+                self.reset()
+                self.first = buffer.first
+                ts, values = buffer.window(buffer.first, buffer.last + 1)
+            else:
+                ts, values = buffer.window(self.last + 1, np.iinfo(np.int64).max)
+            self.update(ts, values)
+            self.first = buffer.first
+
+    def update(self, ts_ns, values):
+        """Add the segments completed by evenly spaced samples newer than the last ones seen."""
+        if not len(ts_ns):
+            return
+        if self.last is not None and ts_ns[0] - self.last != self.period_ns:
+            # A gap: the segment being filled cannot be completed
+            self.ts, self.values = self.ts[:0], self.values[:0]
+            self.next_start = None
+        ts = np.concatenate([self.ts, ts_ns])
+        values = np.concatenate([self.values, np.asarray(values, dtype=np.float64)])
+        self.last = int(ts[-1])
+        step_ns = self.step_s * self.period_ns
+        # Segments start on a fixed grid, so they do not depend on how samples arrive
+        first_start = -(-int(ts[0]) // step_ns) * step_ns
+        if self.next_start is not None:
+            first_start = max(first_start, self.next_start)
+        offset = (first_start - int(ts[0])) // self.period_ns
+        valid = np.flatnonzero(~np.isnan(values))
+        # Missing samples after the last valid one cannot be interpolated yet
+        ready = int(valid[-1]) + 1 if len(valid) else 0
+        n = 0
+        if ready - offset >= self.segment_s:
+            n = (ready - offset - self.segment_s) // self.step_s + 1
+            # Up to the last valid sample, which may lie past the last segment
+            filled, ok = _fill(values[:ready], offset, self.segment_s, self.step_s, n)
+            if ok.any():
+                stop = offset + (n - 1) * self.step_s + self.segment_s
+                psd = periodograms(filled[offset:stop], self.segment_s, self.step_s)[ok]
+                starts = first_start + np.flatnonzero(ok).astype(np.int64) * step_ns
+                self._add(starts, psd)
+        self.next_start = first_start + n * step_ns
+        keep_from = min(offset + n * self.step_s, len(ts))
+        # The last valid sample before the kept ones bounds the interpolation of missing ones after it
+        before = valid[valid < keep_from]
+        if len(before):
+            keep_from = int(before[-1])
+        self.ts, self.values = ts[keep_from:], values[keep_from:]
+
+    def _add(self, starts, psd):
+        self.starts = np.concatenate([self.starts, starts])
+        self.psd = np.concatenate([self.psd, psd])
+        cutoff = int(self.starts[-1]) - self.keep_ns
+        if self.starts[0] < cutoff:
+            i = int(np.searchsorted(self.starts, cutoff))
+            self.starts, self.psd = self.starts[i:], self.psd[i:]
+        self.version += 1
+
+    def _rows(self, start_ns, stop_ns):
+        # Segments lying wholly inside [start_ns, stop_ns)
+        segment_ns = self.segment_s * self.period_ns
+        return slice(*np.searchsorted(self.starts, [start_ns, stop_ns - segment_ns + 1]))
+
+    def welch(self, start_ns, stop_ns):
+        """``(freqs, psd, segments)``: Welch's PSD (Hz²/Hz) over ``[start_ns, stop_ns)``; psd is None without segments."""
+        with self.lock:
+            rows = self.psd[self._rows(start_ns, stop_ns)]
+        return self.freqs, rows.mean(axis=0) if len(rows) else None, len(rows)
+
+    def band_power(self, start_ns, stop_ns, bands=BANDS):
+        """Frame of the power (Hz²) in each band per segment in ``[start_ns, stop_ns)``.
+
+        ``Timestamp`` is the segment's midpoint; ``bands`` maps column name to
+        ``(low_hz, high_hz)``.
+        """
+        with self.lock:
+            rows = self._rows(start_ns, stop_ns)
+            starts, psd = self.starts[rows], self.psd[rows]
+        df_hz = self.freqs[1] - self.freqs[0]
+        out = {"Timestamp": (starts + self.segment_s * self.period_ns // 2).view("datetime64[ns]")}
+        for name, (low, high) in bands.items():
+            mask = (self.freqs >= low) & (self.freqs < high)
+            out[name] = psd[:, mask].sum(axis=1) * df_hz
+        return pd.DataFrame(out)
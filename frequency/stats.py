@@ -0,0 +1,199 @@
+"""Mergeable per-bucket statistics for frequency samples.
+
+A bucket is summarised by a fixed set of columns that can be combined with
+the next bucket without looking at the samples again:
+
+- ``n``, ``count``: samples in the bucket, and those that are not NaN
+- ``mean``, ``m2``: Welford mean and sum of squared deviations
+- ``min``, ``max``
+- ``outside``: samples outside the normal band (49.95–50.05 Hz)
+- ``crossings``: excursions out of the band that start in the bucket
+- ``prefix``, ``suffix``, ``best``: leading, trailing and longest run of
+  outside samples, which is enough to find the longest excursion over
+  any run of buckets
+- ``first``, ``next``: time of the first sample and where the sample after
+  the last one would be; runs are only joined across buckets where one
+  bucket's ``next`` is the following bucket's ``first``
+
+Tables are dicts of equally long NumPy arrays, one row per bucket, so a
+window summary is a reduction over its buckets instead of a scan of the
+raw samples.
+"""
+import numpy as np
+
+BAND_LOW = 49.95
+BAND_HIGH = 50.05
+COLUMNS = ("n", "count", "mean", "m2", "min", "max", "outside", "crossings", "prefix", "suffix", "best", "first", "next")
+# Sample times, kept exact
+TIME_COLUMNS = ("first", "next")
+
+
+def empty():
+    return {c: np.empty(0, dtype=np.int64 if c in TIME_COLUMNS else np.float64) for c in COLUMNS}
+
+
+def accumulate(values, starts, ts_ns=None, period_ns=None):
+    """Statistics rows for consecutive segments of ``values`` beginning at ``starts``.
+
+    ``ts_ns`` are the sample times, ``period_ns`` apart when contiguous: a
+    run of outside samples ends at a gap. Without them the samples are
+    taken to be contiguous and times are sample indices.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n_total = len(values)
+    if not n_total:
+        return empty()
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.append(starts[1:], n_total)
+    seg = np.repeat(np.arange(len(starts)), ends - starts)
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.0)
+    count = np.add.reduceat(valid.astype(np.float64), starts)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.add.reduceat(filled, starts) / count
+    dev = np.where(valid, values - mean[seg], 0.0)
+    m2 = np.add.reduceat(dev * dev, starts)
+    low = np.minimum.reduceat(np.where(valid, values, np.inf), starts)
+    high = np.maximum.reduceat(np.where(valid, values, -np.inf), starts)
+
+    # NaN samples count as inside the band
+    out = valid & ((values < BAND_LOW) | (values > BAND_HIGH))
+    prev_out = np.concatenate([[False], out[:-1]])
+    prev_out[starts] = False
+    if ts_ns is not None:
+        ts_ns = np.asarray(ts_ns, dtype=np.int64)
+        prev_out[1:][np.diff(ts_ns) != period_ns] = False
+        first, next_ = ts_ns[starts], ts_ns[ends - 1] + period_ns
+    else:
+        first, next_ = starts, ends
+    run_start = out & ~prev_out
+    # Length of every outside run; runs never cross a segment boundary
+    run_id = np.cumsum(run_start) - 1
+    run_len = np.bincount(run_id[out], minlength=int(run_start.sum()))
+    run_seg = seg[run_start]
+    best = np.zeros(len(starts))
+    np.maximum.at(best, run_seg, run_len)
+    first_out = out[starts]
+    last_out = out[ends - 1]
+    prefix = np.where(first_out, run_len[run_id[starts]] if len(run_len) else 0, 0)
+    suffix = np.where(last_out, run_len[run_id[ends - 1]] if len(run_len) else 0, 0)
+    return {
+        "n": (ends - starts).astype(np.float64),
+        "count": count,
+        "mean": mean,
+        "m2": m2,
+        "min": low,
+        "max": high,
+        "outside": np.add.reduceat(out.astype(np.float64), starts),
+        "crossings": np.add.reduceat(run_start.astype(np.float64), starts),
+        "prefix": prefix.astype(np.float64),
+        "suffix": suffix.astype(np.float64),
+        "best": best,
+        "first": first,
+        "next": next_,
+    }
+
+
+def merge(a, b):
+    """Combine two single-row dicts (``a`` directly before ``b``) into one."""
+    if a["n"] == 0:
+        return dict(b)
+    if b["n"] == 0:
+        return dict(a)
+    count = a["count"] + b["count"]
+    if count:
+        delta = b["mean"] - a["mean"] if a["count"] and b["count"] else 0.0
+        mean = a["mean"] if not b["count"] else b["mean"] if not a["count"] else a["mean"] + delta * b["count"] / count
+        m2 = a["m2"] + b["m2"] + delta * delta * a["count"] * b["count"] / count
+    else:
+        mean, m2 = np.nan, 0.0
+    adjacent = a["next"] == b["first"]
+    joined = adjacent and a["suffix"] > 0 and b["prefix"] > 0
+    return {
+        "n": a["n"] + b["n"],
+        "count": count,
+        "mean": mean,
+        "m2": m2,
+        "min": min(a["min"], b["min"]),
+        "max": max(a["max"], b["max"]),
+        "outside": a["outside"] + b["outside"],
+        "crossings": a["crossings"] + b["crossings"] - (1 if joined else 0),
+        "prefix": a["prefix"] + b["prefix"] if adjacent and a["prefix"] == a["n"] else a["prefix"],
+        "suffix": b["suffix"] + a["suffix"] if adjacent and b["suffix"] == b["n"] else b["suffix"],
+        "best": max(a["best"], b["best"], a["suffix"] + b["prefix"] if joined else 0),
+        "first": a["first"],
+        "next": b["next"],
+    }
+
+
+def row(table, i):
+    return {c: table[c][i] for c in COLUMNS}
+
+
+def reduce(table):
+    """Merge all rows of ``table`` in order into one row.
+
+    Equivalent to folding ``merge`` over the rows; only the run lengths
+    need a pass in order, the rest is vectorised.
+    """
+    n = table["n"]
+    if not len(n):
+        return {**{c: 0.0 for c in COLUMNS}, "min": np.inf, "max": -np.inf, "mean": np.nan, "first": 0, "next": 0}
+    count = table["count"].sum()
+    has = table["count"] > 0
+    mean = np.nan
+    m2 = 0.0
+    if count:
+        mean = (table["count"][has] * table["mean"][has]).sum() / count
+        dev = table["mean"][has] - mean
+        m2 = table["m2"][has].sum() + (table["count"][has] * dev * dev).sum()
+    adjacent = table["next"][:-1] == table["first"][1:]
+    joins = adjacent & (table["suffix"][:-1] > 0) & (table["prefix"][1:] > 0)
+    # Longest excursion: carry the open run through buckets that are outside throughout
+    best, run = 0.0, 0.0
+    for i in range(len(n)):
+        if i and not adjacent[i - 1]:
+            run = 0.0
+        best = max(best, table["best"][i], run + table["prefix"][i])
+        run = run + n[i] if table["prefix"][i] == n[i] else table["suffix"][i]
+    # The leading and trailing runs stop at a bucket not outside throughout or at a gap
+    stops = np.flatnonzero((table["prefix"] < n) | np.append(~adjacent, True))
+    starts = np.flatnonzero((table["suffix"] < n) | np.insert(~adjacent, 0, True))
+    return {
+        "n": n.sum(),
+        "count": count,
+        "mean": mean,
+        "m2": m2,
+        "min": table["min"].min(),
+        "max": table["max"].max(),
+        "outside": table["outside"].sum(),
+        "crossings": table["crossings"].sum() - joins.sum(),
+        "prefix": table["prefix"][: stops[0] + 1].sum(),
+        "suffix": table["suffix"][starts[-1]:].sum(),
+        "best": best,
+        "first": table["first"][0],
+        "next": table["next"][-1],
+    }
+
+
+def summary(total, period_s=1.0):
+    """Display values for a merged row; durations assume one sample per ``period_s``."""
+    count = int(total["count"])
+    return {
+        "count": count,
+        "mean": total["mean"] if count else np.nan,
+        "std": np.sqrt(total["m2"] / (count - 1)) if count > 1 else np.nan,
+        "min": total["min"] if count else np.nan,
+        "max": total["max"] if count else np.nan,
+        "outside_s": total["outside"] * period_s,
+        "longest_s": total["best"] * period_s,
+        "crossings": int(total["crossings"]),
+    }
+
+
+def describe(values, period_s=1.0):
+    """Summary of a plain array in one pass (for short series such as Fingrid's)."""
+    values = np.asarray(values, dtype=np.float64)
+    if not len(values):
+        return summary({**{c: 0.0 for c in COLUMNS}, "min": np.nan, "max": np.nan, "mean": np.nan}, period_s)
+    return summary(row(accumulate(values, [0]), 0), period_s)
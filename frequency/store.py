@@ -0,0 +1,146 @@
+"""On-disk time-series store for fetched frequency samples.
+
+Layout under ``root``::
+
+    <source>/<YYYY-MM-DD>.ts      int64 ns timestamps (naive UTC), sorted
+    <source>/<YYYY-MM-DD>.val     float64 values, same length
+    <source>/coverage.json        [[lo_ns, hi_ns], ...] ranges already fetched
+
+Day files are raw NumPy columns: new samples are appended to the end and
+reads memory-map the files and cut the range with ``searchsorted``. The
+coverage list records which time ranges have been fetched (even where
+upstream had no samples), so callers can ask for the missing parts only.
+"""
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+DAY_NS = 86_400 * 1_000_000_000
+
+
+def default_root():
+    return os.environ.get("FREQUENCY_STORE_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), ".data"))
+
+
+class FrequencyStore:
+    def __init__(self, root=None):
+        self.root = root or default_root()
+        self._lock = threading.Lock()
+        self._coverage = {}
+
+    def _dir(self, source):
+        path = os.path.join(self.root, source)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def _day_path(self, source, day_ns):
+        return os.path.join(self._dir(source), pd.Timestamp(day_ns).strftime("%Y-%m-%d"))
+
+    def coverage(self, source):
+        if source not in self._coverage:
+            path = os.path.join(self._dir(source), "coverage.json")
+            ranges = []
+            if os.path.exists(path):
+                with open(path) as f:
+                    ranges = [tuple(r) for r in json.load(f)]
+            self._coverage[source] = ranges
+        return self._coverage[source]
+
+    def missing(self, source, lo_ns, hi_ns):
+        """Sub-ranges of ``[lo_ns, hi_ns]`` not covered by earlier fetches."""
+        with self._lock:
+            gaps = []
+            cursor = lo_ns
+            for a, b in self.coverage(source):
+                if b < cursor:
+                    continue
+                if a > hi_ns:
+                    break
+                if a > cursor:
+                    gaps.append((cursor, a - 1))
+                cursor = max(cursor, b + 1)
+            if cursor <= hi_ns:
+                gaps.append((cursor, hi_ns))
+            return gaps
+
+    def write(self, source, ts_ns, values, covered=None):
+        """Store samples and mark ``covered`` (``(lo_ns, hi_ns)``) as fetched."""
+        ts_ns = np.asarray(ts_ns, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        with self._lock:
+            if len(ts_ns):
+                days = ts_ns // DAY_NS
+                bounds = np.flatnonzero(np.diff(days)) + 1
+                for part_ts, part_values in zip(np.split(ts_ns, bounds), np.split(values, bounds)):
+                    self._write_day(source, part_ts, part_values)
+            if covered is not None:
+                self._add_coverage(source, covered)
+
+    def _write_day(self, source, ts_ns, values):
+        base = self._day_path(source, ts_ns[0] - ts_ns[0] % DAY_NS)
+        old_ts, old_values = _load(base)
+        for suffix in (".ts", ".val"):
+            # Drop the tail of a column left longer by an interrupted write
+            if os.path.exists(base + suffix) and os.path.getsize(base + suffix) != len(old_ts) * 8:
+                os.truncate(base + suffix, len(old_ts) * 8)
+        if not len(old_ts) or ts_ns[0] > old_ts[-1]:
+            # Common case: newer samples, append to the end of both columns
+            with open(base + ".val", "ab") as f:
+                f.write(values.tobytes())
+            with open(base + ".ts", "ab") as f:
+                f.write(ts_ns.tobytes())
+            return
+        # Backfill into the middle of a day: merge and rewrite the day
+        all_ts = np.concatenate([old_ts, ts_ns])
+        all_values = np.concatenate([old_values, values])
+        all_ts, first = np.unique(all_ts, return_index=True)
+        for suffix, column in ((".val", all_values[first]), (".ts", all_ts)):
+            with open(base + suffix + ".tmp", "wb") as f:
+                f.write(column.tobytes())
+            os.replace(base + suffix + ".tmp", base + suffix)
+
+    def _add_coverage(self, source, covered):
+        ranges = sorted(self.coverage(source) + [tuple(int(x) for x in covered)])
+        merged = []
+        for a, b in ranges:
+            if merged and a <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], b))
+            else:
+                merged.append((a, b))
+        self._coverage[source] = merged
+        path = os.path.join(self._dir(source), "coverage.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(merged, f)
+        os.replace(path + ".tmp", path)
+
+    def read(self, source, start_ns, stop_ns):
+        """Samples with ``start_ns <= ts < stop_ns`` as ``(ts_ns, values)`` copies."""
+        parts_ts, parts_values = [], []
+        day = start_ns - start_ns % DAY_NS
+        while day < stop_ns:
+            ts, values = _load(self._day_path(source, day))
+            lo, hi = np.searchsorted(ts, [start_ns, stop_ns])
+            if hi > lo:
+                parts_ts.append(np.array(ts[lo:hi]))
+                parts_values.append(np.array(values[lo:hi]))
+            day += DAY_NS
+        if not parts_ts:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        return np.concatenate(parts_ts), np.concatenate(parts_values)
+
+
+def _load(base):
+    """Memory-mapped columns of one day (empty arrays if the day is missing)."""
+    try:
+        n = min(os.path.getsize(base + ".ts") // 8, os.path.getsize(base + ".val") // 8)
+    except OSError:
+        n = 0
+    if n == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    # A write interrupted between the two files leaves one column longer; ignore the extra
+    ts = np.memmap(base + ".ts", dtype=np.int64, mode="r", shape=(n,))
+    values = np.memmap(base + ".val", dtype=np.float64, mode="r", shape=(n,))
+    return ts, values
@@ -0,0 +1,140 @@
+"""Push-based live chart: a Streamlit component that extends Plotly traces.
+
+``st.plotly_chart`` sends the whole figure on every rerun and the browser
+redraws it from scratch. The ``live_chart`` component keeps the figure in
+the browser instead: a ``ChartStream`` remembers the newest point each
+browser has been sent per trace, and a rerun only sends the points after
+it, which the page applies with ``Plotly.extendTraces`` and a sliding time
+window. Per-tick traffic and browser work follow the new data, not the
+window size, so a wall screen can run it around the clock.
+
+Points go out as base64 typed arrays, x as UTC epoch ms (float64) and y
+as float32; the page converts x to Helsinki wall time itself.
+
+The whole figure is only sent for a new ``figure_id`` (other traces,
+theme, language or window) or when the page asks for it after its iframe
+was reloaded.
+
+Streamlit is imported on first use; ``ChartStream`` works without it.
+"""
+import base64
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from frequency.metrics import span
+from frequency.render import LOCAL_TZ, epoch_ms
+
+FRONTEND_DIR = os.path.join(os.path.dirname(__file__), "frontend", "live_chart")
+DEFAULT_HEIGHT = 800
+
+_component = None
+
+
+class ChartStream:
+    """What one browser's live chart has been sent: figure, message number and newest point per trace.
+
+    Traces are read with ``read(lo_ns, hi_ns) -> (ts_ns, values)`` of naive
+    UTC samples with ``lo_ns <= ts < hi_ns``.
+    """
+
+    def __init__(self):
+        self.figure_id = None
+        # Sent to the page instead of figure_id, which may not survive JSON
+        self.generation = 0
+        self.seq = 0
+        self.last = []
+        self.resync = None
+
+    def reset(self):
+        self.figure_id = None
+
+    def message(self, figure_id, build_figure, readers, start_ns, stop_ns, window_ms, height=DEFAULT_HEIGHT, tz=LOCAL_TZ):
+        """Component args for this rerun: the whole figure or the points since the last message."""
+        self.seq += 1
+        if figure_id != self.figure_id:
+            return self._figure(figure_id, build_figure, readers, start_ns, stop_ns, window_ms, height, tz)
+        xs, ys, indices = [], [], []
+        with span("stream_delta"):
+            for i, read in enumerate(readers):
+                ts, values = read(max(self.last[i] + 1, start_ns), stop_ns)
+                if not len(ts):
+                    continue
+                self.last[i] = int(ts[-1])
+                xs.append(typed_array(epoch_ms(ts), "f8"))
+                ys.append(typed_array(values, "f4"))
+                indices.append(i)
+        return {
+            "figure_id": self.generation, "seq": self.seq, "figure": None,
+            "x": xs, "y": ys, "indices": indices, "window_ms": window_ms, "height": height, "tz": tz,
+        }
+
+    def _figure(self, figure_id, build_figure, readers, start_ns, stop_ns, window_ms, height, tz):
+        import plotly.io as pio
+
+        fig = build_figure()
+        self.last = []
+        with span("stream_figure"):
+            for trace, read in zip(fig.data, readers):
+                ts, values = read(start_ns, stop_ns)
+                self.last.append(int(ts[-1]) if len(ts) else start_ns - 1)
+                # Plotly encodes the arrays as typed arrays (bdata) too
+                trace.x, trace.y = epoch_ms(ts).astype(np.float64), np.asarray(values, dtype=np.float32)
+            figure = pio.to_json(fig, validate=False)
+        self.figure_id = figure_id
+        self.generation += 1
+        return {
+            "figure_id": self.generation, "seq": self.seq, "figure": figure,
+            "x": [], "y": [], "indices": [], "window_ms": window_ms, "height": height, "tz": tz,
+        }
+
+
+def typed_array(values, dtype):
+    """``values`` as a plotly.js typed array spec (``{"dtype", "bdata"}``, little-endian); NaN stays NaN."""
+    data = np.ascontiguousarray(values, dtype=np.dtype(dtype).newbyteorder("<"))
+    return {"dtype": dtype, "bdata": base64.b64encode(data.tobytes()).decode("ascii")}
+
+
+def frame_reader(frame, column="FrequencyHz"):
+    """``read`` over a frame with a naive UTC ``Timestamp`` column in time order."""
+    ts = frame["Timestamp"].to_numpy().view("int64") if len(frame) else np.empty(0, dtype=np.int64)
+    values = frame[column].to_numpy() if len(frame) else np.empty(0)
+
+    def read(lo_ns, hi_ns):
+        i, j = np.searchsorted(ts, [lo_ns, hi_ns])
+        return ts[i:j], values[i:j]
+
+    return read
+
+
+def component_dir():
+    """Directory served to the browser: the page and the plotly.js bundled with the plotly package."""
+    import plotly
+
+    target = os.path.join(tempfile.gettempdir(), f"frequency-live-chart-{plotly.__version__}")
+    os.makedirs(target, exist_ok=True)
+    shutil.copyfile(os.path.join(FRONTEND_DIR, "index.html"), os.path.join(target, "index.html"))
+    bundle = os.path.join(target, "plotly.min.js")
+    if not os.path.exists(bundle):
+        # Served locally so the chart also works without internet access
+        shutil.copyfile(os.path.join(os.path.dirname(plotly.__file__), "package_data", "plotly.min.js"), bundle)
+    return target
+
+
+def live_chart(stream, figure_id, build_figure, readers, start_ns, stop_ns, window_ms, key, height=DEFAULT_HEIGHT):
+    """Render the live chart component for ``stream``; ``build_figure()`` gives the figure with one trace per reader."""
+    import streamlit as st
+    import streamlit.components.v1 as components
+
+    global _component
+    if _component is None:
+        _component = components.declare_component("frequency_live_chart", path=component_dir())
+    request = st.session_state.get(key)
+    if request and request != stream.resync:
+        # The page lost its figure (iframe reloaded): send the whole figure again
+        stream.resync = request
+        stream.reset()
+    args = stream.message(figure_id, build_figure, readers, start_ns, stop_ns, window_ms, height)
+    _component(**args, key=key, default=None)
@@ -0,0 +1,175 @@
+"""Columnar parsing and resampling of frequency measurements.
+
+The Statnett BySecond payload is a start time, a sample period and a flat
+list of values, so the time axis is implicit: sample ``i`` sits at
+``StartPointUTC + i * PeriodTickMs``. Everything here works on that form
+with NumPy arrays and only builds a DataFrame for the final result.
+"""
+import numpy as np
+import pandas as pd
+
+from frequency.metrics import span
+
+MS_NS = 1_000_000
+MINUTE_NS = 60_000 * MS_NS
+
+
+def parse_bysecond(payload, since_ns=None):
+    """Return ``(start_ns, period_ns, values)`` for a BySecond response.
+
+    With ``since_ns`` only the samples at or after it are converted.
+    """
+    start_ns = int(payload["StartPointUTC"]) * MS_NS
+    period_ns = int(payload["PeriodTickMs"]) * MS_NS
+    measurements = payload["Measurements"]
+    if since_ns is not None and since_ns > start_ns:
+        skip = -(-(since_ns - start_ns) // period_ns)
+        measurements = measurements[skip:]
+        start_ns += skip * period_ns
+    with span("parse_bysecond"):
+        # None (missing sample) becomes NaN with a float dtype
+        values = np.asarray(measurements, dtype=np.float64)
+    return start_ns, period_ns, values
+
+
+def parse_fingrid(payload):
+    """Return ``(ts_ns, values)`` for a Fingrid dataset response (naive UTC)."""
+    n = len(payload.get("data") or [])
+    ts, values = np.empty(n, dtype=np.int64), np.empty(n)
+    parse_fingrid_into(payload, ts, values)
+    return ts, values
+
+
+def parse_fingrid_into(payload, ts_out, values_out, offset=0):
+    """Parse a Fingrid response page into ``ts_out``/``values_out`` from ``offset``; returns the row count."""
+    rows = payload.get("data") or []
+    with span("parse_fingrid"):
+        # Rows that do not fit (the dataset grew since the first page) are dropped
+        n = max(0, min(len(rows), len(ts_out) - offset))
+        ts = pd.to_datetime([row["startTime"] for row in rows[:n]], utc=True)
+        ts_out[offset:offset + n] = ts.tz_localize(None).as_unit("ns").asi8
+        values_out[offset:offset + n] = [row["value"] for row in rows[:n]]
+    return n
+
+
+def sample_times(start_ns, period_ns, n):
+    """``int64`` ns timestamps of ``n`` evenly spaced samples."""
+    return start_ns + np.arange(n, dtype=np.int64) * period_ns
+
+
+def time_axis(start_ns, period_ns, n):
+    """Naive UTC timestamps for ``n`` samples as ``datetime64[ns]``."""
+    return sample_times(start_ns, period_ns, n).view("datetime64[ns]")
+
+
+def bucket_means(start_ns, period_ns, values, bucket_ns=MINUTE_NS):
+    """Mean of ``values`` per ``bucket_ns`` bucket, like ``resample().mean()``.
+
+    Returns ``(first_bucket_ns, means)``; bucket ``j`` starts at
+    ``first_bucket_ns + j * bucket_ns``. Buckets without valid samples are NaN.
+    """
+    origin = start_ns - start_ns % bucket_ns
+    if len(values) == 0:
+        return origin, np.empty(0)
+    lead, rem = divmod(start_ns - origin, period_ns)
+    if bucket_ns % period_ns == 0 and rem == 0:
+        # Samples line up with bucket edges: pad to whole buckets and reshape
+        per_bucket = bucket_ns // period_ns
+        total = lead + len(values)
+        n_buckets = -(-total // per_bucket)
+        padded = np.full(n_buckets * per_bucket, np.nan)
+        padded[lead:total] = values
+        grid = padded.reshape(n_buckets, per_bucket)
+        valid = ~np.isnan(grid)
+        sums = np.where(valid, grid, 0.0).sum(axis=1)
+        counts = valid.sum(axis=1)
+    else:
+        return bucket_means_ts(sample_times(start_ns, period_ns, len(values)), values, bucket_ns)
+    return origin, _means(sums, counts)
+
+
+def bucket_means_ts(ts_ns, values, bucket_ns=MINUTE_NS):
+    """``bucket_means`` for explicit, sorted ``int64`` timestamps."""
+    origin = int(ts_ns[0]) - int(ts_ns[0]) % bucket_ns if len(ts_ns) else 0
+    if len(values) == 0:
+        return origin, np.empty(0)
+    idx = (ts_ns - origin) // bucket_ns
+    valid = ~np.isnan(values)
+    sums = np.bincount(idx[valid], weights=values[valid], minlength=idx[-1] + 1)
+    counts = np.bincount(idx[valid], minlength=idx[-1] + 1)
+    return origin, _means(sums, counts)
+
+
+def _means(sums, counts):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+
+def minute_range_ns(start, end):
+    """Sample range ``[lo, hi)`` in ns whose minute labels fall in ``start``..``end``."""
+    lo = -(-pd.Timestamp(start).value // MINUTE_NS) * MINUTE_NS
+    hi = (pd.Timestamp(end).value // MINUTE_NS + 1) * MINUTE_NS
+    return lo, hi
+
+
+def nordic_frame(payload, start=None, end=None):
+    """1-minute mean frame (``Timestamp``, ``FrequencyHz``) from a BySecond payload.
+
+    ``start``/``end`` (naive UTC) keep only the minutes whose label falls in
+    the range; samples outside it are sliced off before averaging.
+    """
+    start_ns, period_ns, values = parse_bysecond(payload)
+    if start is not None or end is not None:
+        first, stop = minute_range_ns(
+            start if start is not None else pd.Timestamp(start_ns),
+            end if end is not None else pd.Timestamp(start_ns + len(values) * period_ns),
+        )
+        lo = max(0, -(-(first - start_ns) // period_ns))
+        hi = min(len(values), max(0, -(-(stop - start_ns) // period_ns)))
+        values = values[lo:hi] if lo < hi else values[:0]
+        start_ns += lo * period_ns
+    with span("resample"):
+        return _minute_frame(*bucket_means(start_ns, period_ns, values))
+
+
+def minute_frame(ts_ns, values):
+    """1-minute mean frame from explicit sample timestamps (e.g. a rolling buffer)."""
+    with span("resample"):
+        return _minute_frame(*bucket_means_ts(ts_ns, values))
+
+
+def _minute_frame(origin, means):
+    return pd.DataFrame({
+        "Timestamp": time_axis(origin, MINUTE_NS, len(means)),
+        "FrequencyHz": means,
+    })
+
+
+def merge_frames(df_finnish, df_nordic, previous=None, suffixes=("_Suomi", "_Nordic")):
+    """Nearest-time merge of the Finnish points with the Nordic minute means.
+
+    When ``previous`` (the last merged frame) already covers the start of
+    ``df_finnish``, its rows are reused and only rows from its last
+    timestamp onwards are merged again; that last row is redone because its
+    Nordic minute may have been incomplete.
+    """
+    head = None
+    if previous is not None and not previous.empty and not df_finnish.empty:
+        first = df_finnish["Timestamp"].iloc[0]
+        if previous["Timestamp"].iloc[0] <= first:
+            since = previous["Timestamp"].iloc[-1]
+            columns = ["Timestamp"] + [f"FrequencyHz{s}" for s in suffixes]
+            keep = (previous["Timestamp"] >= first) & (previous["Timestamp"] < since)
+            head = previous.loc[keep, columns]
+            df_finnish = df_finnish[df_finnish["Timestamp"] >= since]
+    with span("merge_asof"):
+        tail = pd.merge_asof(
+            df_finnish.sort_values("Timestamp"),
+            df_nordic.sort_values("Timestamp"),
+            on="Timestamp",
+            direction="nearest",
+            suffixes=suffixes,
+        )
+    if head is None:
+        return tail
+    return pd.concat([head, tail], ignore_index=True)